@@ -0,0 +1,235 @@
+# Deterministic behaviour checks run against the loopback backend with a fixed clock:
+#   python -m bench.check
+import logging
+import sys
+import traceback
+from inspect import signature
+
+from .fakes import install
+from src.config import def_cfg
+from src.controller import ControllerEmulator
+from src.ds4 import BUTTONS, DPAD, DPAD_NORTH, DPAD_EAST, DPAD_SOUTH, DPAD_WEST, DPAD_NORTHEAST, DPAD_NONE
+from src.keymap import scan_codes
+
+
+class Pad:
+    # one emulator on LoopbackInput; keys are pressed by name and every read is one tick
+    def __init__(self, buttons=None, wheel=None, **settings):
+        c = def_cfg()
+        c["settings"]["backend"] = "loopback"
+        c["settings"].update(settings)
+        if buttons is not None:
+            c["keybinds"]["buttons"] = buttons
+        if wheel is not None:
+            c["keybinds"]["wheel"] = wheel
+        self.t = 0.0
+        e = self.emu = ControllerEmulator()
+        e.clock = lambda: self.t
+        e.log.setLevel(logging.WARNING)
+        e.cfg = c
+        e.setup_input()
+        e.setup_ctrl()
+        e.apply(e.build(c))
+        e.inp.start()
+        e.setup_mouse()
+        e.run = True
+
+    def key(self, name, down=True):
+        self.emu.inp.key(scan_codes(name)[0], down)
+
+    def state(self, at=None):
+        if at is not None:
+            self.t = at
+        self.emu.tick()
+        return self.emu.rep.last
+
+    def btns(self, at=None):
+        b = self.state(at)[6]
+        return {n for n, v in BUTTONS.items() if b & v}
+
+
+def check_chords():
+    # a held modifier chord wins over the plain key it contains, in both press orders
+    p = Pad({"cross": "x", "circle": "shift+x", "square": "ctrl+shift+x"})
+    p.key("x")
+    assert p.btns() == {"cross"}
+    p.key("shift")
+    assert p.btns() == {"circle"}
+    p.key("ctrl")
+    assert p.btns() == {"square"}
+    p.key("ctrl", False)
+    assert p.btns() == {"circle"}
+    p.key("shift", False)
+    assert p.btns() == {"cross"}
+    p.key("x", False)
+    assert p.btns() == set()
+    p.key("shift")
+    assert p.btns() == set()
+    p.key("x")
+    assert p.btns() == {"circle"}
+
+
+def check_socd():
+    # opposite d-pad directions held together, pressed one tick apart in either order
+    want = {
+        "last": ((DPAD_SOUTH, DPAD_NORTH), (DPAD_EAST, DPAD_WEST)),
+        "neutral": ((DPAD_NONE, DPAD_NONE), (DPAD_NONE, DPAD_NONE)),
+        "up": ((DPAD_NORTH, DPAD_NORTH), (DPAD_NONE, DPAD_NONE)),
+    }
+    for m, pairs in want.items():
+        p = Pad(dpad_socd=m)
+        for (a, b), got in zip((("up", "down"), ("left", "right")), pairs):
+            for (x, y), w in zip(((a, b), (b, a)), got):
+                p.key(x)
+                assert p.state()[8] == DPAD[x], m
+                p.key(y)
+                assert p.state()[8] == w, (m, x, y)
+                p.key(x, False)
+                assert p.state()[8] == DPAD[y], m
+                p.key(y, False)
+                assert p.state()[8] == DPAD_NONE, m
+        p.key("up")
+        p.key("right")
+        assert p.state()[8] == DPAD_NORTHEAST, m
+
+
+def check_timers():
+    # turbo at 8 Hz flips every 62.5 ms from the press, hold fires once after 250 ms and
+    # toggle flips on each press; times are binary fractions so the edges compare exactly
+    p = Pad({"triangle": {"key": "t", "mode": "turbo", "hz": 8},
+             "square": {"key": "q", "mode": "hold", "ms": 250},
+             "cross": {"key": "x", "mode": "toggle"}})
+    p.t = 1.0
+    p.key("t")
+    seen = [("triangle" in p.btns(1.0 + i / 64)) for i in range(17)]
+    assert seen == ([True] * 4 + [False] * 4) * 2 + [True]
+    p.key("t", False)
+    assert p.btns(1.25) == set()
+    assert p.btns(1.5) == set()
+    p.key("t")
+    assert p.btns(2.0) == {"triangle"}
+    assert p.btns(2.0625 - 1 / 1024) == {"triangle"}
+    assert p.btns(2.0625) == set()
+    p.key("t", False)
+
+    p.key("q")
+    assert p.btns(3.0) == set()
+    assert p.btns(3.25 - 1 / 1024) == set()
+    assert p.btns(3.25) == {"square"}
+    assert p.btns(4.0) == {"square"}
+    p.key("q", False)
+    assert p.btns(4.0) == set()
+    # a tap shorter than the hold never fires, even once its deadline has passed
+    p.key("q")
+    assert p.btns(4.125) == set()
+    p.key("q", False)
+    assert p.btns(4.25) == set()
+    assert p.btns(4.5) == set()
+
+    for want in ({"cross"}, set(), {"cross"}):
+        p.key("x")
+        assert p.btns(p.t + 0.125) == want
+        p.key("x", False)
+        assert p.btns(p.t + 0.125) == want
+
+
+def check_feedback():
+    # vgamepad compares the notification callback's signature with its dummy_callback,
+    # parameter names and defaults included, and refuses the pad on any difference
+    from vgamepad.win.virtual_gamepad import dummy_callback
+    from src.winbackend import WinPad
+    got = []
+    p = WinPad()
+    p.listen(lambda large, small, led: got.append((large, small, led)))
+    assert signature(p.gp.cb) == signature(dummy_callback)
+    p.gp.cb(None, None, 200, 40, 3, None)
+    assert got == [(200, 40, 3)]
+
+
+def check_wrap():
+    # in relative mode an edge hit recenters the cursor; moves the hook queued before the
+    # warp and the warp itself must not read as a jump across the screen
+    from src.winbackend import WinInput
+    i = WinInput()
+    i.relative = True
+    i.begin_mouse()
+    warps = []
+    i.set_cursor = lambda x, y: warps.append((x, y))
+    i.deltas()
+    i.motion(1900, 540)
+    assert warps == [(960, 540)]
+    i.motion(1905, 541)
+    i.motion(1910, 541)
+    assert warps == [(960, 540)]
+    assert i.deltas() == (950, 1)
+    i.motion(960, 540)
+    i.motion(964, 538)
+    assert i.deltas() == (4, -2)
+    # a hook that never reports the warp itself still measures the next move from the centre
+    i.motion(1900, 540)
+    i.deltas()
+    i.motion(957, 541)
+    assert i.deltas() == (-3, 1)
+
+
+def check_wheel():
+    # a trigger driven only by the wheel eases back and ends at rest, not one step above it
+    p = Pad({}, {"l2": {"step": 0.25, "return_ms": 250}})
+    p.state(1.0)
+    p.emu.inp.scroll(1)
+    assert p.state(1.0)[4] == 64
+    assert 0 < p.state(1.03125)[4] < 64
+    for i in range(1, 9):
+        l2 = p.state(1.03125 + i / 64)[4]
+    assert l2 == 0
+    assert p.state(2.0)[4] == 0
+
+
+def check_record():
+    # wheel notches, fractional ones included, come back through the wheel accumulator
+    import os
+    import tempfile
+    from src.backends import LoopbackInput
+    from src.recorder import Recorder, read, apply
+    fd, path = tempfile.mkstemp(suffix='.rec')
+    os.close(fd)
+    try:
+        i = LoopbackInput()
+        i.tap = Recorder(path)
+        i.scroll(1)
+        i.scroll(-0.25)
+        i.scroll(2)
+        i.tap.close()
+        o = LoopbackInput()
+        for r in read(path):
+            apply(o, r)
+        assert o.scrolled() == 2.75
+    finally:
+        os.remove(path)
+
+
+CHECKS = (check_chords, check_socd, check_timers, check_feedback, check_wrap, check_wheel, check_record)
+
+
+def main():
+    # the emulator loads the on-disk config first, which may name the windows backend
+    install()
+    bad = 0
+    for f in CHECKS:
+        n = f.__name__[6:]
+        try:
+            f()
+        except AssertionError as ex:
+            bad += 1
+            ln = traceback.extract_tb(ex.__traceback__)[-1]
+            print(f"{n:<12}FAIL line {ln.lineno}: {ln.line}")
+        except Exception as ex:
+            bad += 1
+            print(f"{n:<12}FAIL {type(ex).__name__}: {ex}")
+        else:
+            print(f"{n:<12}ok")
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
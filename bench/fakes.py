@@ -0,0 +1,319 @@
+import ctypes
+import sys
+import types
+from collections import namedtuple
+from inspect import signature
+from enum import IntEnum, IntFlag
+from src.keymap import SCAN_CODES
+
+KeyboardEvent = namedtuple('KeyboardEvent', 'event_type scan_code name time')
+ButtonEvent = namedtuple('ButtonEvent', 'event_type button time')
+MoveEvent = namedtuple('MoveEvent', 'x y time')
+WheelEvent = namedtuple('WheelEvent', 'delta time')
+
+
+class FakeKeyboard:
+    KEY_DOWN = 'down'
+    KEY_UP = 'up'
+
+    def __init__(self):
+        self.down = set()
+        self.hooks = []
+        self.calls = 0
+
+    def key_to_scan_codes(self, key, error_if_missing=True):
+        if isinstance(key, int):
+            return (key,)
+        c = SCAN_CODES.get(str(key).lower())
+        if c is None:
+            if error_if_missing:
+                raise ValueError(f"Key {key!r} is not mapped to any known key.")
+            return ()
+        return c if isinstance(c, tuple) else (c,)
+
+    def is_pressed(self, key):
+        self.calls += 1
+        if isinstance(key, int):
+            return key in self.down
+        return any(c in self.down for c in self.key_to_scan_codes(key))
+
+    def hook(self, cb):
+        self.hooks.append(cb)
+        return cb
+
+    def unhook(self, cb):
+        if cb in self.hooks:
+            self.hooks.remove(cb)
+
+    def unhook_all(self):
+        self.hooks.clear()
+
+    def set(self, code, down):
+        if down == (code in self.down):
+            return
+        if down:
+            self.down.add(code)
+        else:
+            self.down.discard(code)
+        e = KeyboardEvent(self.KEY_DOWN if down else self.KEY_UP, code, None, 0.0)
+        for h in list(self.hooks):
+            h(e)
+
+
+class FakeMouse:
+    UP = 'up'
+    DOWN = 'down'
+    DOUBLE = 'double'
+    LEFT = 'left'
+    RIGHT = 'right'
+    MIDDLE = 'middle'
+    X = 'x1'
+    X2 = 'x2'
+
+    def __init__(self):
+        self.pos = (960, 540)
+        self.down = set()
+        self.hooks = []
+        self.calls = 0
+
+    def get_position(self):
+        self.calls += 1
+        return self.pos
+
+    def is_pressed(self, button='left'):
+        self.calls += 1
+        return button in self.down
+
+    def hook(self, cb):
+        self.hooks.append(cb)
+        return cb
+
+    def unhook(self, cb):
+        if cb in self.hooks:
+            self.hooks.remove(cb)
+
+    def unhook_all(self):
+        self.hooks.clear()
+
+    def emit(self, e):
+        for h in list(self.hooks):
+            h(e)
+
+    def move(self, x, y):
+        if (x, y) == self.pos:
+            return
+        self.pos = (x, y)
+        self.emit(MoveEvent(x, y, 0.0))
+
+    def set(self, button, down):
+        if down == (button in self.down):
+            return
+        if down:
+            self.down.add(button)
+        else:
+            self.down.discard(button)
+        self.emit(ButtonEvent(self.DOWN if down else self.UP, button, 0.0))
+
+    def wheel(self, delta):
+        self.emit(WheelEvent(delta, 0.0))
+
+
+class FakeWin32:
+    def __init__(self, ms):
+        self.ms = ms
+        self.size = (1920, 1080)
+        self.calls = 0
+
+    def GetSystemMetrics(self, i):
+        self.calls += 1
+        return self.size[i] if i in (0, 1) else 0
+
+    def SetCursorPos(self, p):
+        self.calls += 1
+        self.ms.move(int(p[0]), int(p[1]))
+
+    def ShowCursor(self, show):
+        self.calls += 1
+        return 0
+
+
+class DS4_BUTTONS(IntFlag):
+    DS4_BUTTON_THUMB_RIGHT = 1 << 15
+    DS4_BUTTON_THUMB_LEFT = 1 << 14
+    DS4_BUTTON_OPTIONS = 1 << 13
+    DS4_BUTTON_SHARE = 1 << 12
+    DS4_BUTTON_TRIGGER_RIGHT = 1 << 11
+    DS4_BUTTON_TRIGGER_LEFT = 1 << 10
+    DS4_BUTTON_SHOULDER_RIGHT = 1 << 9
+    DS4_BUTTON_SHOULDER_LEFT = 1 << 8
+    DS4_BUTTON_TRIANGLE = 1 << 7
+    DS4_BUTTON_CIRCLE = 1 << 6
+    DS4_BUTTON_CROSS = 1 << 5
+    DS4_BUTTON_SQUARE = 1 << 4
+
+
+class DS4_SPECIAL_BUTTONS(IntFlag):
+    DS4_SPECIAL_BUTTON_PS = 1 << 0
+    DS4_SPECIAL_BUTTON_TOUCHPAD = 1 << 1
+
+
+class DS4_DPAD_DIRECTIONS(IntEnum):
+    DS4_BUTTON_DPAD_NONE = 0x8
+    DS4_BUTTON_DPAD_NORTHWEST = 0x7
+    DS4_BUTTON_DPAD_WEST = 0x6
+    DS4_BUTTON_DPAD_SOUTHWEST = 0x5
+    DS4_BUTTON_DPAD_SOUTH = 0x4
+    DS4_BUTTON_DPAD_SOUTHEAST = 0x3
+    DS4_BUTTON_DPAD_EAST = 0x2
+    DS4_BUTTON_DPAD_NORTHEAST = 0x1
+    DS4_BUTTON_DPAD_NORTH = 0x0
+
+
+def dummy_callback(client, target, large_motor, small_motor, led_number, user_data):
+    # same signature as vgamepad 0.1.0's vgamepad.win.virtual_gamepad.dummy_callback
+    pass
+
+
+class VDS4Gamepad:
+    created = []
+
+    def __init__(self):
+        self.updates = 0
+        self.calls = 0
+        self.cb = None
+        self.reset()
+        VDS4Gamepad.created.append(self)
+
+    def reset(self):
+        self.lx = self.ly = self.rx = self.ry = 128
+        self.l2 = self.r2 = 0
+        self.buttons = 0x8
+        self.special = 0
+
+    def left_joystick(self, x_value, y_value):
+        self.calls += 1
+        self.lx, self.ly = x_value, y_value
+
+    def right_joystick(self, x_value, y_value):
+        self.calls += 1
+        self.rx, self.ry = x_value, y_value
+
+    def left_joystick_float(self, x_value_float, y_value_float):
+        self.left_joystick(round((x_value_float + 1.0) * 127.5), round((y_value_float + 1.0) * 127.5))
+
+    def right_joystick_float(self, x_value_float, y_value_float):
+        self.right_joystick(round((x_value_float + 1.0) * 127.5), round((y_value_float + 1.0) * 127.5))
+
+    def left_trigger(self, value):
+        self.calls += 1
+        self.l2 = value
+
+    def right_trigger(self, value):
+        self.calls += 1
+        self.r2 = value
+
+    def left_trigger_float(self, value_float):
+        self.left_trigger(round(value_float * 255))
+
+    def right_trigger_float(self, value_float):
+        self.right_trigger(round(value_float * 255))
+
+    def press_button(self, button):
+        self.calls += 1
+        self.buttons |= button
+
+    def release_button(self, button):
+        self.calls += 1
+        self.buttons &= ~button
+
+    def press_special_button(self, special_button):
+        self.calls += 1
+        self.special |= special_button
+
+    def release_special_button(self, special_button):
+        self.calls += 1
+        self.special &= ~special_button
+
+    def directional_pad(self, direction):
+        self.calls += 1
+        self.buttons = (self.buttons & ~0xF) | direction
+
+    def update_extended_report(self, extended_report):
+        self.calls += 1
+        self.updates += 1
+        self.ext = extended_report
+
+    def register_notification(self, callback_function):
+        # vgamepad refuses any callback whose signature differs from dummy_callback
+        if signature(callback_function) != signature(dummy_callback):
+            raise TypeError(f"Needed callback function signature: {signature(dummy_callback)}, "
+                            f"but got: {signature(callback_function)}")
+        self.cb = callback_function
+
+    def unregister_notification(self):
+        self.cb = None
+
+    def update(self):
+        self.updates += 1
+
+    def state(self):
+        return (self.lx, self.ly, self.rx, self.ry, self.l2, self.r2, self.buttons, self.special)
+
+
+class DS4_TOUCH(ctypes.Structure):
+    _fields_ = [("bPacketCounter", ctypes.c_ubyte), ("bIsUpTrackingNum1", ctypes.c_ubyte),
+                ("bTouchData1", ctypes.c_ubyte * 3), ("bIsUpTrackingNum2", ctypes.c_ubyte),
+                ("bTouchData2", ctypes.c_ubyte * 3)]
+
+
+class DS4_SUB_REPORT_EX(ctypes.Structure):
+    _pack_ = 1
+    _fields_ = [("bThumbLX", ctypes.c_ubyte), ("bThumbLY", ctypes.c_ubyte), ("bThumbRX", ctypes.c_ubyte),
+                ("bThumbRY", ctypes.c_ubyte), ("wButtons", ctypes.c_ushort), ("bSpecial", ctypes.c_ubyte),
+                ("bTriggerL", ctypes.c_ubyte), ("bTriggerR", ctypes.c_ubyte), ("wTimestamp", ctypes.c_ushort),
+                ("bBatteryLvl", ctypes.c_ubyte), ("wGyroX", ctypes.c_short), ("wGyroY", ctypes.c_short),
+                ("wGyroZ", ctypes.c_short), ("wAccelX", ctypes.c_short), ("wAccelY", ctypes.c_short),
+                ("wAccelZ", ctypes.c_short), ("_bUnknown1", ctypes.c_ubyte * 5), ("bBatteryLvlSpecial", ctypes.c_ubyte),
+                ("_bUnknown2", ctypes.c_ubyte * 2), ("bTouchPacketsN", ctypes.c_ubyte),
+                ("sCurrentTouch", DS4_TOUCH), ("sPreviousTouch", DS4_TOUCH * 2)]
+
+
+class DS4_REPORT_EX(ctypes.Union):
+    _fields_ = [("Report", DS4_SUB_REPORT_EX), ("ReportBuffer", ctypes.c_ubyte * 63)]
+
+
+def module(name, obj=None, **extra):
+    m = types.ModuleType(name)
+    if obj is not None:
+        for a in dir(obj):
+            v = getattr(obj, a)
+            if not a.startswith('_') and (callable(v) or a.isupper()):
+                setattr(m, a, v)
+    for k, v in extra.items():
+        setattr(m, k, v)
+    return m
+
+
+class Backends:
+    def __init__(self):
+        self.kb = FakeKeyboard()
+        self.ms = FakeMouse()
+        self.w32 = FakeWin32(self.ms)
+
+
+def install():
+    fb = Backends()
+    sys.modules['keyboard'] = module('keyboard', fb.kb, KeyboardEvent=KeyboardEvent)
+    sys.modules['mouse'] = module('mouse', fb.ms, ButtonEvent=ButtonEvent, MoveEvent=MoveEvent, WheelEvent=WheelEvent)
+    sys.modules['win32api'] = module('win32api', fb.w32)
+    sys.modules['vgamepad'] = module(
+        'vgamepad',
+        VDS4Gamepad=VDS4Gamepad,
+        DS4_BUTTONS=DS4_BUTTONS,
+        DS4_SPECIAL_BUTTONS=DS4_SPECIAL_BUTTONS,
+        DS4_DPAD_DIRECTIONS=DS4_DPAD_DIRECTIONS,
+    )
+    sys.modules['vgamepad.win'] = module('vgamepad.win')
+    sys.modules['vgamepad.win.vigem_commons'] = module('vgamepad.win.vigem_commons', DS4_REPORT_EX=DS4_REPORT_EX)
+    sys.modules['vgamepad.win.virtual_gamepad'] = module('vgamepad.win.virtual_gamepad', dummy_callback=dummy_callback)
+    return fb
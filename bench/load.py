@@ -0,0 +1,115 @@
+import argparse
+import math
+import socket
+import sys
+import threading
+import time
+
+
+def frames(n, t):
+    from src.server import pack
+    a = t * 0.01
+    out = []
+    for i in range(n):
+        b = a + i * 0.001
+        out.append(pack(lx=math.cos(b), ly=math.sin(b), btns=(1 << 5) if (t + i) & 64 else 0, r2=(t & 255) / 255))
+    return b''.join(out)
+
+
+def host(hz, port, udp, queue):
+    # a headless emulator end: the server feeding a loopback pad at the tick rate
+    from src.backends import LoopbackPad
+    from src.report import ReportBuilder
+    from src.scheduler import TickScheduler
+    from src.server import RemoteServer
+
+    srv = RemoteServer("127.0.0.1", port, udp, queue)
+    srv.start()
+    rep = ReportBuilder(LoopbackPad())
+    run = [True]
+
+    def loop():
+        sched = TickScheduler(hz)
+        sched.start()
+        while run[0]:
+            rep.clear()
+            srv.merge(rep)
+            rep.flush()
+            sched.wait()
+
+    t = threading.Thread(target=loop, daemon=True)
+    t.start()
+
+    def stop():
+        run[0] = False
+        t.join(timeout=1.0)
+        srv.stop()
+    return srv, rep, stop
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m bench.load", description="Input server load test")
+    ap.add_argument("--connect", help="host:port of a running emulator; omit to host one in-process")
+    ap.add_argument("--port", type=int, default=0, help="port for the in-process server (0 = pick a free one)")
+    ap.add_argument("--udp", action="store_true", help="send datagrams instead of a tcp stream")
+    ap.add_argument("--seconds", type=float, default=3.0)
+    ap.add_argument("--rate", type=float, default=0, help="frames per second, 0 = as fast as possible")
+    ap.add_argument("--batch", type=int, default=8, help="frames per send")
+    ap.add_argument("--hz", type=float, default=1000, help="tick rate of the in-process emulator")
+    ap.add_argument("--queue", type=int, default=1024)
+    a = ap.parse_args(argv)
+
+    srv = stop = rep = None
+    if a.connect:
+        h, p = a.connect.rsplit(":", 1)
+        addr = (h, int(p))
+    else:
+        port = a.port
+        if not port:
+            with socket.socket() as s:
+                s.bind(("127.0.0.1", 0))
+                port = s.getsockname()[1]
+        srv, rep, stop = host(a.hz, port, a.udp, a.queue)
+        addr = ("127.0.0.1", port)
+
+    if a.udp:
+        sk = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sk.connect(addr)
+    else:
+        sk = socket.create_connection(addr)
+        sk.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    sent = 0
+    t0 = time.perf_counter()
+    end = t0 + a.seconds
+    gap = a.batch / a.rate if a.rate else 0
+    nxt = t0
+    try:
+        while True:
+            now = time.perf_counter()
+            if now >= end:
+                break
+            if gap:
+                if now < nxt:
+                    time.sleep(min(nxt - now, 0.001))
+                    continue
+                nxt += gap
+            sk.send(frames(a.batch, sent))
+            sent += a.batch
+    except OSError as e:
+        print(f"send failed after {sent} frames: {e}")
+    el = time.perf_counter() - t0
+    sk.close()
+
+    print(f"sent {sent} frames in {el:.2f} s: {sent / el:,.0f} frames/s over {'udp' if a.udp else 'tcp'}")
+    if srv:
+        time.sleep(0.05)
+        stop()
+        print(f"received {srv.received / el:,.0f} frames/s, {srv.dropped} dropped, {srv.bad} bad, "
+              f"max queue depth {srv.max_depth}, {srv.applied / max(1, srv.batches):.1f} frames per tick, "
+              f"{rep.sent} reports sent")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+import argparse
+import json
+import logging
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+from .fakes import install
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+
+class FakeDriver:
+    def __init__(self, fb):
+        self.fb = fb
+
+    def key(self, code, down):
+        self.fb.kb.set(code, down)
+
+    def button(self, b, down):
+        self.fb.ms.set(b, down)
+
+    def move(self, x, y):
+        self.fb.ms.move(x, y)
+
+
+def idle(d, codes, i):
+    pass
+
+
+def mash(d, codes, i):
+    # every bound key flips every other tick, half of them in antiphase
+    on = (i >> 1) & 1
+    for n, c in enumerate(codes):
+        d.key(c, bool(on ^ (n & 1)))
+    d.button('left', bool(on))
+
+
+def sweep(d, codes, i):
+    a = i * 0.07
+    d.move(960 + int(400 * math.cos(a)), 540 + int(300 * math.sin(a * 1.3)))
+
+
+SCENARIOS = {"idle": idle, "mash": mash, "sweep": sweep}
+
+
+def make_emu(backend, mode):
+    from src.controller import ControllerEmulator
+    from src.config import def_cfg
+
+    l = logging.getLogger('ControllerEmulator')
+    if not l.handlers:
+        h = logging.StreamHandler()
+        h.setLevel(logging.WARNING)
+        l.addHandler(h)
+
+    emu = ControllerEmulator()
+    emu.cfg = def_cfg()
+    emu.cfg["settings"]["backend"] = backend
+    emu.cfg["settings"]["input_mode"] = mode
+    emu.setup_input()
+    emu.setup_ctrl()
+    emu.apply(emu.build(emu.cfg))
+    emu.inp.start()
+    emu.setup_mouse()
+    emu.run = True
+    return emu
+
+
+# couch co-op layout: each pad gets its own movement cluster, pad 1 also owns the mouse
+PAD_MOVES = (
+    ("w", "s", "a", "d"),
+    ("i", "k", "j", "l"),
+    ("up", "down", "left", "right"),
+    ("home", "end", "delete", "page down"),
+)
+PAD_BTNS = ("space", "c", "x", "y", "r", "t", "q", "e", "f", "g", "z", "v", "b", "n", "m", ",",
+            "1", "2", "3", "4", "5", "6", "7", "8", "9", "0", "-", "=", "[", "]", ";", "/")
+
+
+def pad_profiles(n):
+    names = ("cross", "circle", "square", "triangle", "l1", "r1", "l2", "r2")
+    ps = []
+    for i in range(n):
+        mv = PAD_MOVES[i % len(PAD_MOVES)]
+        ks = PAD_BTNS[i * 8 % len(PAD_BTNS):][:8]
+        ps.append({
+            "name": f"pad{i + 1}",
+            "mouse": i == 0,
+            "keybinds": {
+                "movement": dict(zip(("forward", "backward", "left", "right"), mv)),
+                "buttons": dict(zip(names, ks)),
+            },
+        })
+    return ps
+
+
+def make_engine(backend, mode, n):
+    from src.engine import Engine
+    from src.config import def_cfg
+
+    cfg = def_cfg()
+    cfg["settings"]["backend"] = backend
+    cfg["settings"]["input_mode"] = mode
+    cfg["pads"] = pad_profiles(n)
+    eng = Engine(cfg, logging.getLogger('ControllerEmulator'))
+    eng.inp.start()
+    eng.inp.begin_mouse()
+    eng.run = True
+    return eng
+
+
+def run_pads(fb, backend, name, mode, ticks, n):
+    eng = make_engine(backend, mode, n)
+    d = FakeDriver(fb) if backend == "windows" else eng.inp
+    step = SCENARIOS[name]
+    codes = sorted({t for b, t in eng.smp.polls if isinstance(t, int) and not b & eng.exit})
+    u0 = sum(p.rep.sent for p in eng.pads)
+    c0 = device_calls(fb)
+
+    t = time.perf_counter()
+    for i in range(ticks):
+        step(d, codes, i)
+        eng.tick()
+    el = time.perf_counter() - t
+    upd = sum(p.rep.sent for p in eng.pads) - u0
+    calls = device_calls(fb) - c0
+    h = eng.tick_ns
+    al = alloc(d, step, codes, eng.tick, ticks)
+
+    eng.inp.stop()
+    return {
+        "ticks_per_s": round(ticks / el, 1),
+        "pad_ticks_per_s": round(n * ticks / el, 1),
+        "updates_per_tick": round(upd / ticks, 4),
+        "device_calls_per_tick": round(calls / ticks, 2),
+        "alloc_bytes_per_tick": al,
+        "p50_us": round(h.pct(50) / 1000, 2),
+        "p99_us": round(h.pct(99) / 1000, 2),
+        "max_us": round(h.max / 1000, 2),
+    }
+
+
+def alloc(d, step, codes, tick, ticks):
+    # peak bytes allocated inside each tick, over a shorter run after the timed one
+    n = min(ticks, 2000)
+    tracemalloc.start()
+    peak = 0
+    for i in range(n):
+        step(d, codes, ticks + i)
+        tracemalloc.reset_peak()
+        cur = tracemalloc.get_traced_memory()[0]
+        tick()
+        peak += tracemalloc.get_traced_memory()[1] - cur
+    tracemalloc.stop()
+    return round(peak / n, 1)
+
+
+def device_calls(fb):
+    return fb.kb.calls + fb.ms.calls + fb.w32.calls
+
+
+def updates(emu):
+    pad = emu.gp
+    return pad.updates if hasattr(pad, 'updates') else pad.gp.updates
+
+
+def bound_codes(emu):
+    ex = emu.binds.exit
+    return sorted({t for b, t in emu.bundle.polls if isinstance(t, int) and not b & ex})
+
+
+def run_one(fb, backend, name, mode, ticks):
+    emu = make_emu(backend, mode)
+    d = FakeDriver(fb) if backend == "windows" else emu.inp
+    step = SCENARIOS[name]
+    codes = bound_codes(emu)
+    u0 = updates(emu)
+    c0 = device_calls(fb)
+
+    emu.stats.reset()
+    t = time.perf_counter()
+    for i in range(ticks):
+        step(d, codes, i)
+        emu.tick()
+    el = time.perf_counter() - t
+    upd = updates(emu) - u0
+    calls = device_calls(fb) - c0
+    h = emu.stats.tick
+
+    al = alloc(d, step, codes, emu.tick, ticks)
+
+    emu.inp.stop()
+    return {
+        "ticks_per_s": round(ticks / el, 1),
+        "updates_per_tick": round(upd / ticks, 4),
+        "device_calls_per_tick": round(calls / ticks, 2),
+        "alloc_bytes_per_tick": al,
+        "p50_us": round(h.pct(50) / 1000, 2),
+        "p99_us": round(h.pct(99) / 1000, 2),
+        "max_us": round(h.max / 1000, 2),
+    }
+
+
+def compare(res, base, tol):
+    # sweep's update count follows wall-clock smoothing, so it moves in the last digit, and
+    # p99 moves in histogram buckets up to 25% apart; both get a little slack for rounding
+    bad = []
+    for k, r in res.items():
+        b = base.get(k)
+        if not b:
+            continue
+        if r["ticks_per_s"] < b["ticks_per_s"] * (1 - tol):
+            bad.append(f"{k}: ticks/s {r['ticks_per_s']} < baseline {b['ticks_per_s']}")
+        if r["updates_per_tick"] > b["updates_per_tick"] * 1.001 + 1e-9:
+            bad.append(f"{k}: updates/tick {r['updates_per_tick']} > baseline {b['updates_per_tick']}")
+        if r["device_calls_per_tick"] > b.get("device_calls_per_tick", r["device_calls_per_tick"]) + 1e-9:
+            bad.append(f"{k}: device calls/tick {r['device_calls_per_tick']} > baseline {b['device_calls_per_tick']}")
+        if r["p99_us"] > b["p99_us"] * (1 + tol) + 0.01:
+            bad.append(f"{k}: p99 {r['p99_us']} us > baseline {b['p99_us']} us")
+        if r["alloc_bytes_per_tick"] > b["alloc_bytes_per_tick"] * (1 + tol) + 64:
+            bad.append(f"{k}: alloc {r['alloc_bytes_per_tick']} B/tick > baseline {b['alloc_bytes_per_tick']}")
+    return bad
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m bench", description="Headless input loop benchmark")
+    ap.add_argument("--ticks", type=int, default=20000)
+    ap.add_argument("--scenario", default=",".join(SCENARIOS))
+    ap.add_argument("--mode", default="poll,event")
+    ap.add_argument("--backend", default="windows", help="windows (with fakes) or loopback")
+    ap.add_argument("--pads", type=int, default=4, help="also run the multi-pad engine with this many pads (0 to skip)")
+    ap.add_argument("--baseline", default=BASELINE)
+    ap.add_argument("--save", action="store_true", help="store this run as the baseline")
+    ap.add_argument("--check", action="store_true", help="fail if the run regresses against the baseline")
+    ap.add_argument("--tolerance", type=float, default=0.25)
+    a = ap.parse_args(argv)
+
+    fb = install()
+    res = {}
+    print(f"{'run':<24}{'ticks/s':>11}{'upd/tick':>10}{'calls':>8}{'B/tick':>9}{'p50 us':>9}{'p99 us':>9}{'max us':>9}")
+    for be in a.backend.split(","):
+        for mode in a.mode.split(","):
+            for sc in a.scenario.split(","):
+                if sc not in SCENARIOS:
+                    ap.error(f"unknown scenario '{sc}'")
+                k = f"{be}/{mode}/{sc}"
+                r = run_one(fb, be, sc, mode, a.ticks)
+                res[k] = r
+                print(f"{k:<24}{r['ticks_per_s']:>11}{r['updates_per_tick']:>10}{r['device_calls_per_tick']:>8}"
+                      f"{r['alloc_bytes_per_tick']:>9}"
+                      f"{r['p50_us']:>9}{r['p99_us']:>9}{r['max_us']:>9}")
+            if a.pads:
+                k = f"{be}/{mode}/{a.pads}pads"
+                r = run_pads(fb, be, "mash", mode, a.ticks, a.pads)
+                res[k] = r
+                ok = "ok" if r["ticks_per_s"] >= 1000 else "TOO SLOW"
+                print(f"{k:<24}{r['ticks_per_s']:>11}{r['updates_per_tick']:>10}{r['device_calls_per_tick']:>8}"
+                      f"{r['alloc_bytes_per_tick']:>9}{r['p50_us']:>9}{r['p99_us']:>9}{r['max_us']:>9}"
+                      f"  {r['pad_ticks_per_s']:.0f} pad-ticks/s, 1000 Hz x {a.pads}: {ok}")
+
+    if a.save:
+        with open(a.baseline, 'w') as f:
+            json.dump(res, f, indent=2)
+        print(f"Baseline saved to {a.baseline}")
+
+    if a.check:
+        try:
+            with open(a.baseline) as f:
+                base = json.load(f)
+        except FileNotFoundError:
+            print(f"No baseline at {a.baseline}; run with --save first")
+            return 2
+        bad = compare(res, base, a.tolerance)
+        for b in bad:
+            print("REGRESSION", b)
+        return 1 if bad else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
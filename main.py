@@ -1,6 +1,9 @@
+import time
+T0 = time.perf_counter()
 import os
 import logging
 from src.controller import ControllerEmulator
+T1 = time.perf_counter()
 
 def main():
     print("Kois PS4 Controller Emulater")
@@ -8,17 +11,26 @@ def main():
 
     try:
         emu = ControllerEmulator()
+        boot = f"Imports {(T1 - T0) * 1000:.1f} ms. {emu.boot_report()}. Menu ready after {(time.perf_counter() - T0) * 1000:.1f} ms"
 
         while True:
             os.system('cls' if os.name == 'nt' else 'clear')
+            if boot:
+                print(boot)
+                boot = None
             print("\nOptions:")
             print("1. Start keyboard and mouse mapping")
             print("2. Run demo sequence")
             print("3. Reset controller")
             print("4. Configuration menu")
-            print("5. Exit")
+            print("5. Show input loop stats")
+            print("6. Record input session")
+            print("7. Replay input session")
+            print("8. Play scripted sequence")
+            print("9. Start multi-pad mapping")
+            print("10. Exit")
 
-            c = input("Enter your choice (1-5): ").strip()
+            c = input("Enter your choice (1-10): ").strip()
 
             if c == "1":
                 emu.start_kb()
@@ -29,9 +41,22 @@ def main():
             elif c == "4":
                 emu.show_menu()
             elif c == "5":
+                emu.show_stats()
+                input("Press Enter to continue...")
+            elif c == "6":
+                emu.record_session()
+            elif c == "7":
+                emu.replay_session()
+                input("Press Enter to continue...")
+            elif c == "8":
+                emu.play_file()
+            elif c == "9":
+                emu.start_multi()
+            elif c == "10":
                 print("Exiting...")
-                if emu.run:
-                    emu.stop_kb()
+                emu.close()
+                if emu.eng:
+                    emu.eng.close()
                 break
             else:
                 print("Invalid choice. Please try again.")
@@ -0,0 +1,267 @@
+import queue
+import threading
+import time
+from .keymap import scan_codes
+from .report import neutral
+
+
+EDGE = 64
+
+
+class Accumulator:
+    # single writer (add) and single reader (drain); the running total is swapped
+    # as one tuple so the reader never sees half an update and no lock is needed
+    __slots__ = ('acc', 'rd')
+
+    def __init__(self):
+        self.acc = (0, 0)
+        self.rd = (0, 0)
+
+    def add(self, dx, dy):
+        ax, ay = self.acc
+        self.acc = (ax + dx, ay + dy)
+
+    def drain(self):
+        a = self.acc
+        r = self.rd
+        self.rd = a
+        return a[0] - r[0], a[1] - r[1]
+
+    def clear(self):
+        self.rd = self.acc
+
+
+class InputBackend:
+    evented = False
+
+    def __init__(self):
+        self.wake = threading.Event()
+        self.first_ns = 0
+        self.tap = None
+        self.relative = False
+        self.wheel = False
+        self.wh = Accumulator()
+
+    def start(self):
+        pass
+
+    def stop(self):
+        self.wake.set()
+
+    def scan_codes(self, name):
+        raise NotImplementedError
+
+    def pressed(self, k):
+        raise NotImplementedError
+
+    def snapshot(self, polls):
+        # the state of every bound key as one bitmask; polls pairs each key's bit with its token
+        p = self.pressed
+        m = 0
+        for b, t in polls:
+            if p((t,)):
+                m |= b
+        return m
+
+    def get_position(self):
+        raise NotImplementedError
+
+    def screen_size(self):
+        raise NotImplementedError
+
+    def set_cursor(self, x, y):
+        pass
+
+    def show_cursor(self, show):
+        pass
+
+    def begin_mouse(self):
+        pass
+
+    def deltas(self):
+        raise NotImplementedError
+
+    def scrolled(self):
+        # wheel notches since the last call; backends only collect them while self.wheel is set
+        return self.wh.drain()[0]
+
+    def mark(self):
+        if not self.first_ns:
+            self.first_ns = time.perf_counter_ns()
+        self.wake.set()
+
+    def take(self):
+        t = self.first_ns
+        self.first_ns = 0
+        return t
+
+    def wait(self, timeout):
+        self.wake.wait(timeout)
+        self.wake.clear()
+
+
+class PadBackend:
+    def submit(self, s, last):
+        raise NotImplementedError
+
+    def reset(self):
+        raise NotImplementedError
+
+    def listen(self, fn):
+        # fn(large, small, led) is called from whatever thread the driver uses
+        pass
+
+    def close(self):
+        pass
+
+
+class LoopbackInput(InputBackend):
+    def __init__(self, evented=False, size=(1920, 1080)):
+        super().__init__()
+        self.evented = evented
+        self.down = set()
+        self.pos = (size[0] // 2, size[1] // 2)
+        self.size = size
+        self.acc = Accumulator()
+
+    def scan_codes(self, name):
+        return scan_codes(name)
+
+    def key(self, code, down):
+        if down:
+            self.down.add(code)
+        else:
+            self.down.discard(code)
+        if self.tap:
+            self.tap.key(code, down)
+        self.mark()
+
+    def button(self, b, down):
+        if down:
+            self.down.add(b)
+        else:
+            self.down.discard(b)
+        if self.tap:
+            self.tap.button(b, down)
+        self.mark()
+
+    def scroll(self, d):
+        self.wh.add(d, 0)
+        if self.tap:
+            self.tap.scroll(d)
+        self.mark()
+
+    def move(self, x, y):
+        px, py = self.pos
+        self.motion(x - px, y - py)
+
+    def motion(self, dx, dy):
+        x, y = self.pos
+        self.pos = (x + dx, y + dy)
+        self.acc.add(dx, dy)
+        if self.tap:
+            self.tap.motion(dx, dy)
+        self.mark()
+
+    def begin_mouse(self):
+        self.acc.clear()
+
+    def deltas(self):
+        return self.acc.drain()
+
+    def snapshot(self, polls):
+        d = set(self.down)
+        m = 0
+        for b, t in polls:
+            if t in d:
+                m |= b
+        return m
+
+    def pressed(self, k):
+        d = self.down
+        for c in k:
+            if c in d:
+                return True
+        return False
+
+    def get_position(self):
+        return self.pos
+
+    def screen_size(self):
+        return self.size
+
+    def set_cursor(self, x, y):
+        self.pos = (x, y)
+
+
+class LoopbackPad(PadBackend):
+    def __init__(self, maxsize=4096):
+        self.q = queue.Queue(maxsize)
+        self.updates = 0
+        self.dropped = 0
+        self.fn = None
+
+    def submit(self, s, last):
+        self.updates += 1
+        if s.__class__ is not tuple:
+            # extended reports arrive in the builder's reused array
+            s = tuple(s)
+        try:
+            self.q.put_nowait(s)
+        except queue.Full:
+            try:
+                self.q.get_nowait()
+                self.dropped += 1
+            except queue.Empty:
+                pass
+            self.q.put_nowait(s)
+
+    def reset(self):
+        self.submit(neutral(), None)
+
+    def listen(self, fn):
+        self.fn = fn
+
+    def notify(self, large, small, led=0):
+        if self.fn:
+            self.fn(large, small, led)
+
+
+def input_key(cfg):
+    st = cfg["settings"]
+    return (st.get("backend", "windows"), st.get("input_mode", "poll"))
+
+
+def key_codes(cfg):
+    # the scan code lookup of a backend without creating it, so configs compile before
+    # any hook, cursor or driver module is loaded
+    be = cfg["settings"].get("backend", "windows")
+    if be == "loopback":
+        return scan_codes
+    if be == "windows":
+        import keyboard
+        return keyboard.key_to_scan_codes
+    raise ValueError(f"Unknown backend '{be}'")
+
+
+def make_input(cfg):
+    be, mode = input_key(cfg)
+    if be == "loopback":
+        return LoopbackInput(evented=mode == "event")
+    if be == "windows":
+        if mode == "event":
+            from .events import EventInput
+            return EventInput()
+        from .winbackend import WinInput
+        return WinInput()
+    raise ValueError(f"Unknown backend '{be}'")
+
+
+def make_pad(cfg):
+    be = cfg["settings"].get("backend", "windows")
+    if be == "loopback":
+        return LoopbackPad()
+    if be == "windows":
+        from .winbackend import WinPad
+        return WinPad()
+    raise ValueError(f"Unknown backend '{be}'")
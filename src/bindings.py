@@ -0,0 +1,192 @@
+from collections import namedtuple
+from itertools import product
+from .ds4 import BUTTONS, SPECIAL, TRIGGERS
+from .dpad import ORDER
+from .move import WHEEL_TARGETS
+from .timed import BTN, SPEC, TRIG
+
+MOUSE_BTNS = ('left', 'right', 'middle', 'x1', 'x2')
+ALIASES = {'return': 'enter'}
+EXIT_KEY = "'"
+
+Binds = namedtuple('Binds', 'move dpad btns specs trigs timed exit walk wheel touch')
+
+# mode -> (parameter name, default); see timed.py for what each one does
+MODES = {"turbo": ("hz", 10), "toggle": (None, 0), "hold": ("ms", 300), "double": ("ms", 250), "analog": ("ms", 200)}
+
+
+def resolve(b, sc):
+    if isinstance(b, list):
+        ks = []
+        for x in b:
+            for c in resolve(x, sc):
+                if c not in ks:
+                    ks.append(c)
+        return tuple(ks)
+    if not b:
+        return ()
+    if not isinstance(b, str):
+        raise ValueError(f"Invalid key binding: {b!r}")
+
+    bn = b.lower()
+    bn = ALIASES.get(bn, bn)
+    if bn.startswith('mouse:'):
+        bt = bn.split(':', 1)[1]
+        if bt not in MOUSE_BTNS:
+            raise ValueError(f"Unknown mouse button '{b}'")
+        return (bt,)
+    try:
+        cs = tuple(sc(bn))
+    except ValueError:
+        cs = ()
+    if not cs:
+        raise ValueError(f"Unknown key '{b}'")
+    return cs
+
+
+def chords(b, sc):
+    # every way a binding can be satisfied, as tuples of tokens that must all be down.
+    # "shift+w" expands to one chord per shift key
+    if isinstance(b, list):
+        out = []
+        for x in b:
+            for c in chords(x, sc):
+                if c not in out:
+                    out.append(c)
+        return out
+    if isinstance(b, str) and '+' in b.strip('+'):
+        ps = [resolve(p.strip(), sc) for p in b.split('+')]
+        if not all(ps):
+            raise ValueError(f"Invalid chord '{b}'")
+        return list(product(*ps))
+    return [(t,) for t in resolve(b, sc)]
+
+
+class KeyIndex:
+    # gives every token a bit so the whole pressed state of a tick is one int
+    def __init__(self):
+        self.bits = {}
+        self.toks = []
+
+    def mask(self, c):
+        m = 0
+        for t in c:
+            b = self.bits.get(t)
+            if b is None:
+                b = self.bits[t] = len(self.toks)
+                self.toks.append(t)
+            m |= 1 << b
+        return m
+
+    def polls(self):
+        return tuple((1 << i, t) for i, t in enumerate(self.toks))
+
+
+def hit(k, mask):
+    # k is a plain chord mask when nothing can override it, else ((chord, longer chords), ...)
+    if k.__class__ is int:
+        return mask & k == k
+    for c, sup in k:
+        if mask & c == c:
+            for l in sup:
+                if mask & l == l:
+                    break
+            else:
+                return True
+    return False
+
+
+def keys(b, sc, ix):
+    # a match for a lone key or chord that nothing overrides, as used by hotkeys
+    cs = tuple(ix.mask(c) for c in chords(b, sc))
+    return cs[0] if len(cs) == 1 else tuple((c, ()) for c in cs)
+
+
+def match(cs, sup):
+    if len(cs) == 1 and not sup[cs[0]]:
+        return cs[0]
+    return tuple((c, sup[c]) for c in cs)
+
+
+def compile_binds(cfg, sc, ix=None):
+    ix = ix or KeyIndex()
+    seen = set()
+
+    def m(b):
+        cs = tuple(ix.mask(c) for c in chords(b, sc))
+        seen.update(cs)
+        return cs
+
+    kb = cfg["keybinds"]
+    mk = kb["movement"]
+    move = [m(mk[d]) for d in ("forward", "backward", "left", "right")]
+    walk = m(mk["walk"]) if mk.get("walk") else ()
+    touch = m(kb["touch"]) if kb.get("touch") else ()
+
+    wheel = []
+    for t, w in kb.get("wheel", {}).items():
+        if t not in WHEEL_TARGETS:
+            raise ValueError(f"Cannot bind the mouse wheel to '{t}'")
+        w = w if isinstance(w, dict) else {"step": w}
+        wheel.append((t, float(w.get("step", 0.1)), float(w.get("return_ms", 0)) / 1000))
+
+    # both the dpad section and dpad_* buttons feed the four direction bits
+    dpad = {d: () for d in ORDER}
+    for d, k in kb.get("dpad", {}).items():
+        if d in dpad:
+            dpad[d] += m(k)
+
+    btns, specs, trigs, timed = [], [], [], []
+    for bn, k in kb["buttons"].items():
+        if isinstance(k, dict):
+            e = timed_bind(bn, k, m)
+            if e:
+                timed.append(e)
+            continue
+        ks = m(k)
+        if bn in TRIGGERS:
+            trigs.append((ks, bn))
+        elif bn.startswith("dpad_"):
+            d = bn[5:]
+            if d in dpad:
+                dpad[d] += ks
+        elif bn in BUTTONS:
+            btns.append((ks, BUTTONS[bn]))
+        elif bn in SPECIAL:
+            specs.append((ks, SPECIAL[bn]))
+    ex = m(EXIT_KEY)
+
+    # longest chord wins: a chord is overridden while any chord containing it is held
+    sup = {c: tuple(l for l in seen if l != c and l & c == c) for c in seen}
+    f = lambda cs: match(cs, sup)
+    return Binds(tuple(f(k) for k in move),
+                 tuple(f(dpad[d]) for d in ORDER),
+                 tuple((f(k), v) for k, v in btns),
+                 tuple((f(k), v) for k, v in specs),
+                 tuple((f(k), t) for k, t in trigs),
+                 tuple((f(e[0]),) + e[1:] for e in timed),
+                 f(ex),
+                 f(walk),
+                 tuple(wheel),
+                 f(touch))
+
+
+def timed_bind(bn, k, m):
+    md = k.get("mode")
+    if md not in MODES:
+        raise ValueError(f"Unknown binding mode {md!r} for {bn}")
+    pn, dv = MODES[md]
+    p = float(k.get(pn, dv)) if pn else 0.0
+    if pn and p <= 0:
+        raise ValueError(f"{bn}: {pn} must be positive")
+    if bn in TRIGGERS:
+        return (m(k.get("key")), TRIG, bn, md, p)
+    if md == "analog":
+        raise ValueError(f"{bn}: analog mode only applies to l2 and r2")
+    if bn in BUTTONS:
+        return (m(k.get("key")), BTN, BUTTONS[bn], md, p)
+    if bn in SPECIAL:
+        return (m(k.get("key")), SPEC, SPECIAL[bn], md, p)
+    if bn.startswith("dpad_"):
+        raise ValueError(f"{bn}: timed modes are not supported on the d-pad")
+    return None
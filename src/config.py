@@ -1,7 +1,10 @@
+import hashlib
 import json
 import os
 import sys
 import logging
+import pickle
+import threading
 
 def get_paths():
     if getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):
@@ -27,17 +30,49 @@ def def_cfg():
             },
             "dpad": {
                 "up": "up", "down": "down", "left": "left", "right": "right"
-            }
+            },
+            "touch": "v"
         },
         "settings": {
             "mouse_sensitivity": 0.05,
             "deadzone_threshold": 0.01,
+            "deadzone_mode": "axial",
+            "curve": {"type": "power", "exponent": 1.0},
             "controller_type": "dualshock4",
             "relative_mouse_mode": False,
-            "hide_cursor": False
-        }
+            "hide_cursor": False,
+            "backend": "windows",
+            "input_mode": "poll",
+            "poll_rate_hz": 1000,
+            "spin_us": 200,
+            "smoothing": {"type": "exp", "tau_ms": 6.0, "jump": 0.5},
+            "decay_ms": 50,
+            "dpad_socd": "last",
+            "movement": {"ramp_up_ms": 0, "ramp_down_ms": 0, "ramp": "linear", "normalize": True, "walk_scale": 0.5},
+            "profile_hotkey": "f9",
+            "server": {"enabled": False, "host": "127.0.0.1", "port": 7777, "udp": True, "queue": 1024},
+            "emit_mode": "inline",
+            "emit_hz": 0,
+            "ds4_extended": False,
+            "feedback": {"enabled": True, "queue": 256, "sinks": ["stats"], "script": ""},
+            "gyro": {"mouse": "gyro", "sensitivity": 0.1, "invert_x": False, "invert_y": False}
+        },
+        "profiles": {}
     }
 
+DEFAULT_PROFILE = "default"
+
+def profile_cfgs(cfg):
+    # the top level keybinds and settings form the default profile; named profiles
+    # replace the keybinds and override individual settings
+    ps = {DEFAULT_PROFILE: {"keybinds": cfg["keybinds"], "settings": cfg["settings"]}}
+    for n, p in (cfg.get("profiles") or {}).items():
+        ps[n] = {
+            "keybinds": p.get("keybinds", cfg["keybinds"]),
+            "settings": {**cfg["settings"], **p.get("settings", {})},
+        }
+    return ps
+
 def load_cfg(log):
     p = get_paths()
     c = [
@@ -66,13 +101,89 @@ def load_cfg(log):
         log.error(f"Could not create default config: {e}")
     return cfg
 
+def cfg_path():
+    p = get_paths()
+    for d in (p["base_dir"], p["data_dir"]):
+        cp = os.path.join(d, 'config.json')
+        if os.path.exists(cp):
+            return cp
+    return os.path.join(p["base_dir"], 'config.json')
+
+# bump when anything stored in the compiled cache changes shape
+CACHE_VERSION = 7
+
+def code_stamp():
+    # the cache holds pickled instances of our own classes, so any change to the code that
+    # defines them has to miss; a frozen build is stamped by its executable instead
+    v = getattr(code_stamp, 'v', None)
+    if v is None:
+        if getattr(sys, 'frozen', False):
+            fs = [sys.executable]
+        else:
+            d = os.path.dirname(os.path.abspath(__file__))
+            fs = [os.path.join(d, n) for n in sorted(os.listdir(d)) if n.endswith('.py')]
+        h = hashlib.sha1()
+        for f in fs:
+            try:
+                st = os.stat(f)
+            except OSError:
+                continue
+            h.update(f"{os.path.basename(f)}:{st.st_mtime_ns}:{st.st_size};".encode())
+        v = code_stamp.v = h.hexdigest()
+    return v
+
+def cache_key(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (CACHE_VERSION, code_stamp(), os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+def cache_path(path):
+    return os.path.splitext(path)[0] + '.cache'
+
+def load_cache(path, log, stale=False):
+    # stale accepts a cache from an older version of the file, as a last good config
+    k = cache_key(path)
+    if k is None:
+        return None
+    try:
+        with open(cache_path(path), 'rb') as f:
+            ck, v = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        log.warning(f"Ignoring unreadable config cache: {e}")
+        return None
+    if ck == k or stale and ck[:3] == k[:3]:
+        return v
+    return None
+
+def save_cache(path, v, log):
+    k = cache_key(path)
+    if k is None:
+        return
+    cp = cache_path(path)
+    try:
+        with open(cp + '.tmp', 'wb') as f:
+            pickle.dump((k, v), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(cp + '.tmp', cp)
+    except (OSError, pickle.PicklingError) as e:
+        log.warning(f"Could not write config cache {cp}: {e}")
+
+def write_json(path, cfg):
+    # write next to the target and rename over it so readers never see a half-written file
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(cfg, f, indent=2)
+    os.replace(tmp, path)
+
 def save_cfg(cfg, log):
     p = get_paths()
     cp = os.path.join(p["base_dir"], 'config.json')
     try:
         os.makedirs(os.path.dirname(cp), exist_ok=True)
-        with open(cp, 'w') as f:
-            json.dump(cfg, f, indent=2)
+        write_json(cp, cfg)
         log.info(f"Configuration saved successfully to {cp}")
     except IOError as e:
         log.error(f"Failed to save config to {cp}: {e}")
@@ -81,8 +192,53 @@ def save_cfg(cfg, log):
             fd = os.path.join(ar, 'ControllerEmulator')
             os.makedirs(fd, exist_ok=True)
             fp = os.path.join(fd, 'config.json')
-            with open(fp, 'w') as f:
-                json.dump(cfg, f, indent=2)
+            write_json(fp, cfg)
             log.info(f"Configuration saved to fallback location {fp}")
         except Exception as e2:
             log.error(f"Fallback save failed: {e2}")
+
+class ConfigWatcher:
+    def __init__(self, path, on_change, log, interval=0.5):
+        self.path = path
+        self.on_change = on_change
+        self.log = log
+        self.interval = interval
+        self.mt = self.mtime()
+        self.done = threading.Event()
+        self.t = None
+
+    def mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def start(self):
+        if self.t and self.t.is_alive():
+            return
+        self.done.clear()
+        self.t = threading.Thread(target=self.watch, daemon=True)
+        self.t.start()
+
+    def stop(self):
+        self.done.set()
+
+    def watch(self):
+        while not self.done.wait(self.interval):
+            self.check()
+
+    def check(self):
+        mt = self.mtime()
+        if mt is None or mt == self.mt:
+            return
+        self.mt = mt
+        try:
+            with open(self.path, 'r') as f:
+                cfg = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            self.log.error(f"Ignoring config change, could not read '{self.path}': {e}")
+            return
+        try:
+            self.on_change(cfg)
+        except Exception as e:
+            self.log.error(f"Config reload failed: {e}")
@@ -1,35 +1,300 @@
-import keyboard
-import mouse
-import win32api
-import vgamepad as vg
 import time
 import threading
 import logging
 import os
 import sys
 import json
-from .config import load_cfg, save_cfg, def_cfg
+import copy
+from collections import namedtuple
+from .config import load_cfg, save_cfg, def_cfg, cfg_path, load_cache, save_cache, ConfigWatcher, profile_cfgs, DEFAULT_PROFILE
+from .report import ReportBuilder
+from .bindings import compile_binds, hit, keys, KeyIndex
+from .scheduler import TickScheduler
+from .stats import Stats, format_stats
+from .backends import make_input, make_pad, input_key, key_codes
+from .recorder import Recorder, replay
+from .timeline import Timeline, DEMO, load_script
+from .curves import Curve, CURVES
+from . import stick
+from .engine import Engine
+from .server import RemoteServer
+from .mailbox import Mailbox, Emitter
+from .feedback import Feedback
+from . import dpad
+from . import motion
+from . import move
+from . import timed
+
+Compiled = namedtuple('Compiled', 'cfg binds curve stick dpad move motion')
+Bundle = namedtuple('Bundle', 'cfg profiles names hotkeys cycle polls')
 
 class ControllerEmulator:
     def __init__(self):
         self.gp = None
+        self.rep = None
         self.run = False
         self.t = None
-        self.lmx = None
-        self.lmy = None
-        self.crx = 0.0
-        self.cry = 0.0
-        self.lmt = 0.0
-        self.dpad = vg.DS4_DPAD_DIRECTIONS.DS4_BUTTON_DPAD_NONE
+        self.inp = None
+        self.sched = None
+        self.stats = Stats()
+        self.rec = None
+        self.tls = []
+        self.tl_lock = threading.Lock()
+        self.st = None
+        self.eng = None
+        self.srv = None
+        self.emit = None
+        self.fb = None
+        self.clock = time.perf_counter
         self.log = self.setup_log()
-        self.cfg = load_cfg(self.log)
-        self.setup_ctrl()
+        self.cfg = None
+        self.inp_key = None
+        self.pending = None
+        self.want = None
+        self.sw_lock = threading.Lock()
+        self.prof = None
+        self.hk = set()
+        self.mask = 0
+        self.t_start = 0
+        self.boot = []
+        self.ro = False
+        self.apply(self.load())
+        self.watch = ConfigWatcher(cfg_path(), self.on_cfg, self.log)
+
+    def load(self):
+        # the virtual pad and the Windows input hooks are created on first use, not here
+        t = time.perf_counter()
+        p = cfg_path()
+        c = load_cache(p, self.log)
+        if c is not None:
+            self.boot.append(("config (cached)", time.perf_counter() - t))
+            return c
+        cfg = load_cfg(self.log)
+        self.boot.append(("config", time.perf_counter() - t))
+        t = time.perf_counter()
+        try:
+            c = self.build(cfg)
+        except (KeyError, TypeError, ValueError):
+            # a bad binding must not keep the menu that can fix it from starting, and what
+            # runs instead must not be saved over the file the user still has to fix
+            self.ro = True
+            c = load_cache(p, self.log, stale=True)
+            if c is not None:
+                self.log.warning(f"Invalid configuration in {p}, using the last good configuration")
+            else:
+                self.log.warning(f"Invalid configuration in {p}, using the defaults")
+                c = self.build(def_cfg())
+            return c
+        self.boot.append(("compile", time.perf_counter() - t))
+        save_cache(p, c, self.log)
+        return c
+
+    def boot_report(self):
+        return "Startup: " + ", ".join(f"{n} {dt * 1000:.1f} ms" for n, dt in self.boot)
+
+    def ensure_input(self):
+        if self.inp is None or input_key(self.cfg) != self.inp_key:
+            self.setup_input()
+
+    def ensure_ctrl(self):
+        if self.rep is None:
+            t = time.perf_counter()
+            self.setup_ctrl()
+            self.boot.append(("pad", time.perf_counter() - t))
+
+    def build(self, cfg):
+        # every profile and hotkey shares one key index, so a tick polls each key once
+        ix = KeyIndex()
+        ps = {}
+        for n, pc in profile_cfgs(cfg).items():
+            c = self.build_curve(pc)
+            ps[n] = Compiled(pc, self.compile(pc, ix), c, self.build_stick(c, pc), self.build_dpad(pc),
+                                self.build_move(pc), self.build_motion(pc))
+        hk, cyc = self.hotkeys(cfg, len(ps) > 1, ix)
+        return Bundle(cfg, ps, tuple(ps), hk, cyc, ix.polls())
+
+    def hotkeys(self, cfg, multi, ix):
+        sc = key_codes(cfg)
+        try:
+            hk = tuple((keys(p["hotkey"], sc, ix), n) for n, p in (cfg.get("profiles") or {}).items() if p.get("hotkey"))
+            cyc = keys(cfg["settings"].get("profile_hotkey") or "", sc, ix) if multi else ()
+            return hk, cyc
+        except ValueError as e:
+            self.log.error(f"Invalid profile hotkey: {e}")
+            raise
 
-    def deadzone(self, v, dz):
-        return 0.0 if abs(v) < dz else v
+    def apply(self, b):
+        hz = self.cfg["settings"].get("poll_rate_hz", 1000) if self.cfg else None
+        self.cfg = b.cfg
+        self.bundle = b
+        n = self.prof
+        if n not in b.profiles:
+            n = b.cfg.get("profile", DEFAULT_PROFILE)
+            if n not in b.profiles:
+                n = DEFAULT_PROFILE
+        self.use(n)
+        nh = b.cfg["settings"].get("poll_rate_hz", 1000)
+        if self.sched and nh != hz:
+            try:
+                self.sched.set_rate(nh)
+            except (TypeError, ValueError) as e:
+                self.log.error(f"Invalid polling rate, keeping {self.sched.hz:g} Hz: {e}")
+        if self.inp and input_key(b.cfg) != self.inp_key:
+            self.log.info("Backend and input mode changes take effect the next time mapping starts")
+
+    def use(self, n):
+        c = self.bundle.profiles[n]
+        self.prof = n
+        self.pcfg = c.cfg
+        self.binds = c.binds
+        self.curve = c.curve
+        self.stick = c.stick
+        self.stick.clear()
+        self.dp = c.dpad
+        self.dp.reset()
+        self.mv = c.move
+        self.mv.clear()
+        self.wheels = move.wheels(c.binds.wheel)
+        self.mo = c.motion
+        if self.mo:
+            self.mo.clear()
+        if self.rep:
+            self.rep.extended(self.mo is not None)
+        self.tb = timed.build(c.binds.timed)
+        self.timers = timed.Timers()
+        if self.run:
+            self.inp.relative = c.cfg["settings"].get("relative_mouse_mode", False)
+
+    def switch_profile(self, n):
+        if n not in self.bundle.profiles:
+            self.log.error(f"Unknown profile '{n}'")
+            return False
+        if self.run:
+            with self.sw_lock:
+                self.want = n
+        else:
+            self.switched(n)
+        return True
 
-    def crv(self, d, s, e=1.0):
-        return s * (abs(d) ** e) * (1 if d > 0 else -1)
+    def switched(self, n):
+        if n == self.prof:
+            return
+        self.use(n)
+        self.stats.switches += 1
+        self.stats.profile = n
+        self.log.info(f"Switched to profile '{n}'")
+
+    def edge(self, k):
+        d = self.pressed(k)
+        if d == (k in self.hk):
+            return False
+        if d:
+            self.hk.add(k)
+        else:
+            self.hk.discard(k)
+        return d
+
+    def check_hotkeys(self, bd):
+        for k, n in bd.hotkeys:
+            if self.edge(k):
+                self.switched(n)
+        if bd.cycle and self.edge(bd.cycle):
+            ns = bd.names
+            self.switched(ns[(ns.index(self.prof) + 1) % len(ns)])
+
+    def swap(self, c):
+        # the loop thread picks this up between ticks; when idle there is no reader to race
+        if self.run:
+            with self.sw_lock:
+                self.pending = c
+        else:
+            self.apply(c)
+
+    def handoff(self):
+        # the watcher and menu threads store under the same lock, so nothing lands between
+        # reading a slot and clearing it
+        with self.sw_lock:
+            c, self.pending = self.pending, None
+            w, self.want = self.want, None
+        if c is not None:
+            self.apply(c)
+        if w is not None:
+            self.switched(w)
+
+    def on_cfg(self, cfg):
+        with self.sw_lock:
+            p = self.pending
+        cur = p.cfg if p else self.cfg
+        if cfg == cur:
+            self.ro = False
+            return
+        try:
+            c = self.build(cfg)
+        except (KeyError, TypeError, ValueError):
+            self.log.error("Config file change rejected, keeping the current configuration")
+            return
+        self.swap(c)
+        self.ro = False
+        save_cache(self.watch.path, c, self.log)
+        self.log.info("Configuration reloaded from disk")
+
+    def edit(self):
+        return copy.deepcopy(self.cfg)
+
+    def commit(self, cfg):
+        if self.ro:
+            self.log.error(f"{cfg_path()} is invalid; fix it on disk before saving changes from the menu")
+            return False
+        try:
+            c = self.build(cfg)
+        except (KeyError, TypeError, ValueError):
+            return False
+        self.swap(c)
+        save_cfg(cfg, self.log)
+        save_cache(cfg_path(), c, self.log)
+        return True
+
+    def compile(self, cfg, ix=None):
+        try:
+            return compile_binds(cfg, key_codes(cfg), ix)
+        except (KeyError, ValueError) as e:
+            self.log.error(f"Invalid keybind configuration: {e}")
+            raise
+
+    def build_curve(self, cfg):
+        try:
+            return Curve(cfg["settings"])
+        except (TypeError, ValueError) as e:
+            self.log.error(f"Invalid mouse curve configuration: {e}")
+            raise
+
+    def build_stick(self, curve, cfg):
+        try:
+            return stick.build(curve, cfg["settings"])
+        except (TypeError, ValueError) as e:
+            self.log.error(f"Invalid mouse smoothing configuration: {e}")
+            raise
+
+    def build_dpad(self, cfg):
+        try:
+            return dpad.build(cfg["settings"])
+        except ValueError as e:
+            self.log.error(f"Invalid d-pad configuration: {e}")
+            raise
+
+    def build_move(self, cfg):
+        try:
+            return move.build(cfg["settings"])
+        except (TypeError, ValueError) as e:
+            self.log.error(f"Invalid movement configuration: {e}")
+            raise
+
+    def build_motion(self, cfg):
+        try:
+            return motion.build(cfg["settings"])
+        except (TypeError, ValueError) as e:
+            self.log.error(f"Invalid gyro configuration: {e}")
+            raise
 
     def setup_log(self):
         l = logging.getLogger('ControllerEmulator')
@@ -43,88 +308,69 @@ class ControllerEmulator:
 
         return l
 
-    def setup_ctrl(self):
+    def setup_input(self, cfg=None):
+        cfg = cfg or self.cfg
         try:
-            self.gp = vg.VDS4Gamepad()
-            self.log.info("DualShock 4 controller emulated successfully!")
+            t = time.perf_counter()
+            self.inp = make_input(cfg)
+            self.inp_key = input_key(cfg)
+            self.boot.append(("input backend", time.perf_counter() - t))
         except Exception as e:
-            self.log.error(f"Failed to setup controller: {e}")
+            self.log.error(f"Failed to setup input backend: {e}")
             raise
 
-    def btn_state(self, btn, pressed):
+    def setup_ctrl(self):
         try:
-            if pressed:
-                if btn in [vg.DS4_SPECIAL_BUTTONS.DS4_SPECIAL_BUTTON_TOUCHPAD, vg.DS4_SPECIAL_BUTTONS.DS4_SPECIAL_BUTTON_PS]:
-                    self.gp.press_special_button(special_button=btn)
-                else:
-                    self.gp.press_button(button=btn)
-            else:
-                if btn in [vg.DS4_SPECIAL_BUTTONS.DS4_SPECIAL_BUTTON_TOUCHPAD, vg.DS4_SPECIAL_BUTTONS.DS4_SPECIAL_BUTTON_PS]:
-                    self.gp.release_special_button(special_button=btn)
-                else:
-                    self.gp.release_button(button=btn)
-            self.gp.update()
+            self.gp = make_pad(self.cfg)
+            self.rep = ReportBuilder(self.gp)
+            self.rep.extended(self.mo is not None)
+            self.log.info("DualShock 4 controller emulated successfully!")
+            self.start_feedback()
         except Exception as e:
-            self.log.error(f"Failed to set button state: {e}")
+            self.log.error(f"Failed to setup controller: {e}")
+            raise
 
     def left_stick(self, x, y):
-        try:
-            self.gp.left_joystick_float(x_value_float=x, y_value_float=y)
-            self.gp.update()
-        except Exception as e:
-            self.log.error(f"Failed to set left joystick: {e}")
+        self.rep.left(x, y)
 
     def right_stick(self, x, y):
-        try:
-            self.gp.right_joystick_float(x_value_float=x, y_value_float=y)
-            self.gp.update()
-        except Exception as e:
-            self.log.error(f"Failed to set right joystick: {e}")
+        self.rep.right(x, y)
 
-    def trig(self, t, v):
+    def send(self):
         try:
-            if t == "l2":
-                self.gp.left_trigger_float(value_float=v)
-            elif t == "r2":
-                self.gp.right_trigger_float(value_float=v)
-            self.gp.update()
+            return self.rep.flush()
         except Exception as e:
-            self.log.error(f"Failed to set {t} trigger: {e}")
+            self.log.error(f"Failed to send controller report: {e}")
+            return False
 
-    def reset(self):
+    def reset(self, pad=True):
+        # pad is False while an emitter thread may still be inside the driver
         try:
-            if self.gp:
-                self.gp.reset()
-                self.gp.update()
-            self.crx = 0.0
-            self.cry = 0.0
-            self.lmt = 0.0
-            self.dpad = vg.DS4_DPAD_DIRECTIONS.DS4_BUTTON_DPAD_NONE
+            if self.rep and pad:
+                self.rep.reset()
+            self.stick.clear()
+            self.dp.reset()
+            self.mv.clear()
+            for w in self.wheels:
+                w.clear()
             self.log.info("Controller reset!")
         except Exception as e:
             self.log.error(f"Failed to reset controller: {e}")
 
-    def btn_map(self):
-        return {
-            "cross": vg.DS4_BUTTONS.DS4_BUTTON_CROSS,
-            "circle": vg.DS4_BUTTONS.DS4_BUTTON_CIRCLE,
-            "square": vg.DS4_BUTTONS.DS4_BUTTON_SQUARE,
-            "triangle": vg.DS4_BUTTONS.DS4_BUTTON_TRIANGLE,
-            "l1": vg.DS4_BUTTONS.DS4_BUTTON_SHOULDER_LEFT,
-            "r1": vg.DS4_BUTTONS.DS4_BUTTON_SHOULDER_RIGHT,
-            "l3": vg.DS4_BUTTONS.DS4_BUTTON_THUMB_LEFT,
-            "r3": vg.DS4_BUTTONS.DS4_BUTTON_THUMB_RIGHT,
-            "share": vg.DS4_BUTTONS.DS4_BUTTON_SHARE,
-            "options": vg.DS4_BUTTONS.DS4_BUTTON_OPTIONS,
-            "touchpad": vg.DS4_SPECIAL_BUTTONS.DS4_SPECIAL_BUTTON_TOUCHPAD,
-            "ps": vg.DS4_SPECIAL_BUTTONS.DS4_SPECIAL_BUTTON_PS
-        }
-
-    def change_kb(self, cat, act, nk):
+    def change_kb(self, cat, act, nk, cfg=None):
         try:
-            if cat in self.cfg["keybinds"] and act in self.cfg["keybinds"][cat]:
-                self.cfg["keybinds"][cat][act] = nk
-                save_cfg(self.cfg, self.log)
+            d = self.edit() if cfg is None else cfg
+            if cat in d["keybinds"] and act in d["keybinds"][cat]:
+                old = d["keybinds"][cat][act]
+                d["keybinds"][cat][act] = nk
+                try:
+                    compile_binds(d, key_codes(d))
+                except ValueError as e:
+                    d["keybinds"][cat][act] = old
+                    self.log.error(f"Invalid key for {act}: {e}")
+                    return False
+                if cfg is None and not self.commit(d):
+                    return False
                 self.log.info(f"Changed {act} to {nk}")
                 return True
             else:
@@ -134,11 +380,21 @@ class ControllerEmulator:
             self.log.error(f"Failed to change keybind: {e}")
             return False
 
-    def change_set(self, s, v):
+    def change_set(self, s, v, cfg=None):
         try:
-            if s in self.cfg["settings"]:
-                self.cfg["settings"][s] = v
-                save_cfg(self.cfg, self.log)
+            d = self.edit() if cfg is None else cfg
+            if s in d["settings"] or s in def_cfg()["settings"]:
+                st = d["settings"]
+                old = st.get(s)
+                st[s] = v
+                try:
+                    stick.build(Curve(st), st)
+                except (TypeError, ValueError) as e:
+                    st[s] = old
+                    self.log.error(f"Invalid value for {s}: {e}")
+                    return False
+                if cfg is None and not self.commit(d):
+                    return False
                 self.log.info(f"Changed {s} to {v}")
                 return True
             else:
@@ -150,15 +406,11 @@ class ControllerEmulator:
 
     def setup_mouse(self):
         try:
-            sw = win32api.GetSystemMetrics(0)
-            sh = win32api.GetSystemMetrics(1)
-            cx, cy = sw // 2, sh // 2
-            
-            win32api.SetCursorPos((cx, cy))
-            self.lmx, self.lmy = mouse.get_position()
+            self.inp.relative = self.pcfg["settings"].get("relative_mouse_mode", False)
+            self.inp.begin_mouse()
             
             if self.cfg["settings"].get("hide_cursor", False):
-                win32api.ShowCursor(False)
+                self.inp.show_cursor(False)
                 
         except Exception as e:
             self.log.error(f"Failed to setup mouse mode: {e}")
@@ -166,260 +418,417 @@ class ControllerEmulator:
     def cleanup_mouse(self):
         try:
             if self.cfg["settings"].get("hide_cursor", False):
-                win32api.ShowCursor(True)
+                self.inp.show_cursor(True)
         except Exception as e:
             self.log.error(f"Failed to cleanup mouse mode: {e}")
 
-    def start_kb(self):
+    def start_kb(self, record=None):
         if self.run and self.t and self.t.is_alive():
             self.log.warning("Keyboard mapping already running")
             return
+        if self.eng and self.eng.run:
+            self.log.warning("Multi-pad mapping is running")
+            return
             
+        self.ensure_input()
+        self.ensure_ctrl()
+
+        if record:
+            try:
+                self.rec = Recorder(record)
+                self.inp.tap = self.rec
+                self.log.info(f"Recording session to {record}")
+            except OSError as e:
+                self.log.error(f"Failed to start recording: {e}")
+                return
+
         self.run = True
+        st = self.st
+        if st and st.is_alive():
+            st.join(timeout=1.0)
         self.log.info("Keyboard and mouse mapping started!")
         self.print_ctrl()
+        self.watch.check()
+        self.t_start = time.perf_counter_ns()
+        self.inp.wheel = any(c.binds.wheel for c in self.bundle.profiles.values())
+        self.inp.start()
         self.setup_mouse()
-        
-        self.t = threading.Thread(target=self.input_loop, daemon=True)
+        self.watch.start()
+        self.start_server()
+        self.start_emitter()
+        if self.rec:
+            self.rec.move(*self.inp.get_position())
+        self.stats.reset()
+        self.stats.profile = self.prof
+        self.hk = set()
+
+        if self.inp.evented:
+            self.t = threading.Thread(target=self.event_loop, daemon=True)
+        else:
+            self.t = threading.Thread(target=self.input_loop, daemon=True)
         self.t.start()
 
     def input_loop(self):
-        bm = self.btn_map()
-        
+        st = self.cfg["settings"]
+        try:
+            self.sched = TickScheduler(st.get("poll_rate_hz", 1000), st.get("spin_us", 200))
+        except (TypeError, ValueError) as e:
+            self.log.error(f"Invalid polling rate, using 1000 Hz: {e}")
+            self.sched = TickScheduler()
+        self.sched.start()
+
         while self.run:
-            try:
-                self.handle_move()
-                self.handle_mouse()
-                self.handle_dpad()
-                self.handle_btns(bm)
-                
-                if self.is_pressed("'"):
-                    self.stop_kb()
-                    break
-                    
-            except KeyboardInterrupt:
+            if not self.tick():
                 break
-            except Exception as e:
-                self.log.error(f"Input handler error: {e}")
-                
-            time.sleep(0.001)
+            self.sched.wait()
 
-    def handle_move(self):
+    def event_loop(self):
+        while self.run:
+            if not self.tick():
+                break
+            self.inp.wait(self.next_wake())
+
+    def next_wake(self):
+        step = 1.0 / self.cfg["settings"].get("poll_rate_hz", 1000)
+        if self.tls:
+            return step
+        now = self.clock()
+        w = self.stick.wake(now)
+        if self.tb:
+            tw = timed.wake(self.tb, self.timers, now, step)
+            if tw is not None and (w is None or tw < w):
+                w = tw
+        # ramps and wheel axes easing back to rest both need steady ticks
+        if self.mv.active or move.wake(self.wheels, step):
+            w = step if w is None else min(w, step)
+        return w
+
+    def tick(self):
         try:
-            lx, ly = 0.0, 0.0
-            mk = self.cfg["keybinds"]["movement"]
-            
-            if self.is_pressed(mk["forward"]):
-                ly = -1.0
-            elif self.is_pressed(mk["backward"]):
-                ly = 1.0
-            
-            if self.is_pressed(mk["left"]):
-                lx = -1.0
-            elif self.is_pressed(mk["right"]):
-                lx = 1.0
-            
-            self.left_stick(lx, ly)
-        except KeyError as e:
-            self.log.error(f"Missing movement key configuration: {e}")
+            if self.pending is not None or self.want is not None:
+                self.handoff()
+            b = self.binds
+            pc = time.perf_counter_ns
+            t0 = pc()
+            # one snapshot per tick; every binding, hotkey and the exit key read from it
+            self.mask = self.inp.snapshot(self.bundle.polls)
+            self.handle_move(b)
+            t1 = pc()
+            self.handle_mouse()
+            t2 = pc()
+            self.handle_dpad(b)
+            t3 = pc()
+            self.handle_btns(b)
+            if self.srv:
+                self.srv.merge(self.rep)
+            if self.tls:
+                self.run_timelines(t3)
+            t4 = pc()
+            sent = self.send()
+            t5 = pc()
+            if self.t_start:
+                self.log.info(f"First tick {(t5 - self.t_start) / 1e6:.1f} ms after start")
+                self.t_start = 0
+            self.stats.record_tick(t0, t1, t2, t3, t4, t5, sent)
+            ev = self.inp.take()
+            if ev and sent:
+                self.stats.latency.record(t5 - ev)
+
+            bd = self.bundle
+            if bd.hotkeys or bd.cycle:
+                self.check_hotkeys(bd)
+
+            if self.pressed(b.exit):
+                self.stop_kb()
+                return False
 
-    def handle_mouse(self):
-        try:
-            mx, my = mouse.get_position()
-            
-            if self.lmx is not None and self.lmy is not None:
-                dx = mx - self.lmx
-                dy = my - self.lmy
-                
-                sens = self.cfg["settings"]["mouse_sensitivity"]
-                
-                if abs(dx) > 0 or abs(dy) > 0:
-                    self.lmt = time.time()
-                    
-                    sx = self.crv(dx, sens)
-                    sy = self.crv(dy, sens)
-                    
-                    sx = max(-1.0, min(1.0, sx))
-                    sy = max(-1.0, min(1.0, sy))
-                    
-                    dz = self.cfg["settings"]["deadzone_threshold"]
-                    sx = self.deadzone(sx, dz)
-                    sy = self.deadzone(sy, dz)
-                    
-                    spd = abs(sx - self.crx) + abs(sy - self.cry)
-                    a = 0.15 if spd > 0.5 else 0.0
-                    self.crx = (1 - a) * self.crx + a * sx if a > 0 else sx
-                    self.cry = (1 - a) * self.cry + a * sy if a > 0 else sy
-                else:
-                    ct = time.time()
-                    if ct - self.lmt > 0.05:
-                        self.crx = 0.0
-                        self.cry = 0.0
-                
-                self.right_stick(self.crx, self.cry)
-                
-                if self.cfg["settings"].get("relative_mouse_mode", False):
-                    sw = win32api.GetSystemMetrics(0)
-                    sh = win32api.GetSystemMetrics(1)
-                    cx, cy = sw // 2, sh // 2
-                    win32api.SetCursorPos((cx, cy))
-                    self.lmx, self.lmy = cx, cy
-                else:
-                    self.lmx, self.lmy = mx, my
-            else:
-                self.lmx, self.lmy = mx, my
-                
+        except KeyboardInterrupt:
+            return False
         except Exception as e:
-            self.log.error(f"Mouse handling error: {e}")
+            self.log.error(f"Input handler error: {e}")
+        return True
 
-    def handle_dpad(self):
-        try:
-            cd = vg.DS4_DPAD_DIRECTIONS.DS4_BUTTON_DPAD_NONE
-            
-            ap = False
-            if "dpad" in self.cfg["keybinds"]:
-                for d, k in self.cfg["keybinds"]["dpad"].items():
-                    if self.is_pressed(k):
-                        ap = True
-                        if d == "up":
-                            cd = vg.DS4_DPAD_DIRECTIONS.DS4_BUTTON_DPAD_NORTH
-                        elif d == "down":
-                            cd = vg.DS4_DPAD_DIRECTIONS.DS4_BUTTON_DPAD_SOUTH
-                        elif d == "left":
-                            cd = vg.DS4_DPAD_DIRECTIONS.DS4_BUTTON_DPAD_WEST
-                        elif d == "right":
-                            cd = vg.DS4_DPAD_DIRECTIONS.DS4_BUTTON_DPAD_EAST
-                        break
-            
-            if not ap:
-                for bn, k in self.cfg["keybinds"]["buttons"].items():
-                    if bn.startswith("dpad_") and self.is_pressed(k):
-                        d = bn.replace("dpad_", "")
-                        if d == "up":
-                            cd = vg.DS4_DPAD_DIRECTIONS.DS4_BUTTON_DPAD_NORTH
-                        elif d == "down":
-                            cd = vg.DS4_DPAD_DIRECTIONS.DS4_BUTTON_DPAD_SOUTH
-                        elif d == "left":
-                            cd = vg.DS4_DPAD_DIRECTIONS.DS4_BUTTON_DPAD_WEST
-                        elif d == "right":
-                            cd = vg.DS4_DPAD_DIRECTIONS.DS4_BUTTON_DPAD_EAST
-                        break
-            
-            if cd != self.dpad:
-                self.dpad = cd
-                self.gp.directional_pad(cd)
-                self.gp.update()
-                
-        except KeyError as e:
-            self.log.error(f"Missing d-pad configuration: {e}")
-        except Exception as e:
-            self.log.error(f"D-pad handling error: {e}")
+    def handle_move(self, b):
+        fw, bk, lf, rt = b.move
+        p = self.pressed
+        dy = -1 if p(fw) else 1 if p(bk) else 0
+        dx = -1 if p(lf) else 1 if p(rt) else 0
+        self.left_stick(*self.mv.step(dx, dy, p(b.walk), self.clock()))
 
-    def handle_btns(self, bm):
+    def handle_mouse(self):
         try:
-            for bn, b in self.cfg["keybinds"]["buttons"].items():
-                ip = self.any_pressed(b)
-                
-                if bn in ["l2", "r2"]:
-                    v = 1.0 if ip else 0.0
-                    self.trig(bn, v)
-                elif not bn.startswith("dpad_"):
-                    if bn in bm:
-                        self.btn_state(bm[bn], ip)
-                
-        except KeyError as e:
-            self.log.error(f"Missing button configuration: {e}")
-        except Exception as e:
-            self.log.error(f"Button handling error: {e}")
+            dx, dy = self.inp.deltas()
+            mo = self.mo
+            if mo:
+                mo.step(self.rep, dx, dy, self.pressed(self.binds.touch), self.inp, self.clock())
+                if not mo.stick:
+                    return
+            p = self.stick
+            p.step(dx, dy, self.clock())
+            self.right_stick(p.x, p.y)
 
-    def any_pressed(self, b):
-        try:
-            if isinstance(b, list):
-                return any(self.is_pressed(x) for x in b)
-            return self.is_pressed(b)
         except Exception as e:
-            self.log.error(f"Binding check error for {b}: {e}")
-            return False
-
-    def is_pressed(self, b):
-        if not b:
-            return False
-        am = {
-            'return': 'enter',
-        }
-        bn = am.get(b.lower(), b.lower())
+            self.log.error(f"Mouse handling error: {e}")
 
-        if bn.startswith('mouse:'):
-            bt = bn.split(':', 1)[1]
-            if bt in { 'left', 'right', 'middle', 'x1', 'x2' }:
-                try:
-                    return mouse.is_pressed(bt)
-                except Exception:
-                    return False
-            return False
-        else:
-            try:
-                return keyboard.is_pressed(bn)
-            except Exception:
-                return False
+    def handle_dpad(self, b):
+        m = self.mask
+        d = 0
+        for i, k in enumerate(b.dpad):
+            if hit(k, m):
+                d |= 1 << i
+        self.rep.dpad(self.dp.dir(d))
+
+    def handle_btns(self, b):
+        rep = self.rep
+        for k, v in b.btns:
+            rep.btn(v, self.pressed(k))
+        for k, v in b.specs:
+            rep.special(v, self.pressed(k))
+        for k, t in b.trigs:
+            rep.trig(t, 1.0 if self.pressed(k) else 0.0)
+        if self.tb:
+            self.handle_timed(rep)
+        if self.wheels:
+            self.handle_wheel(rep)
+
+    def handle_wheel(self, rep):
+        d = self.inp.scrolled()
+        now = self.clock()
+        for w in self.wheels:
+            w.feed(d, now)
+            w.apply(rep)
+
+    def handle_timed(self, rep):
+        now = self.clock()
+        tm = self.timers
+        tb = self.tb
+        for t in tb:
+            d = self.pressed(t.keys)
+            if d != t.down:
+                t.edge(d, now, tm)
+        tm.run(now)
+        for t in tb:
+            t.apply(rep, now)
+
+    def pressed(self, k):
+        return hit(k, self.mask)
 
     def stop_kb(self):
         if not self.run:
             return
             
         self.run = False
+        self.inp.stop()
+        if self.rec:
+            self.inp.tap = None
+            self.rec.close()
+            self.log.info(f"Recorded {self.rec.count} input events to {self.rec.path}")
+            self.rec = None
         self.cleanup_mouse()
-        self.crx = 0.0
-        self.cry = 0.0
-        self.lmt = 0.0
-        self.reset()
         
-        if self.t and self.t.is_alive():
+        if self.t and self.t.is_alive() and self.t is not threading.current_thread():
             self.t.join(timeout=1.0)
-            
+
+        self.watch.stop()
+        free = True
+        if self.emit:
+            free = self.emit.stop()
+            self.rep.mb = None
+            self.log.info(self.emit.summary())
+        if self.srv:
+            self.srv.stop()
+            self.log.info(self.srv.summary())
+        self.handoff()
+        self.reset(free)
         self.log.info("Keyboard mapping stopped!")
+        self.log.info(f"Reports sent: {self.rep.sent}, suppressed: {self.rep.suppressed}")
+        if self.sched:
+            self.log.info(f"Ticks: {self.sched.ticks} at {self.sched.hz:g} Hz, overruns: {self.sched.overruns}, worst: {self.sched.max_late / 1e6:.2f} ms")
+
+    def record_session(self):
+        p = input("Recording file (e.g. session.rec): ").strip()
+        if p:
+            self.start_kb(record=p)
+
+    def replay_session(self):
+        if self.run:
+            self.log.warning("Stop mapping before replaying a session")
+            return
+        p = input("Recording file: ").strip()
+        if not p:
+            return
+        rt = input("Replay in real time? (y/N): ").strip().lower() == "y"
+        try:
+            self.ensure_input()
+            self.ensure_ctrl()
+            self.stats.reset()
+            n = replay(self, p, realtime=rt)
+            self.reset()
+            self.log.info(f"Replayed {p} in {n} ticks")
+            self.show_stats()
+        except (OSError, ValueError) as e:
+            self.log.error(f"Replay failed: {e}")
+
+    def dump_stats(self):
+        s = format_stats(self.stats, self.rep, self.sched)
+        if self.srv:
+            s += "\n" + self.srv.summary()
+        if self.emit:
+            s += "\n" + self.emit.summary()
+        if self.fb:
+            s += "\n" + self.fb.summary()
+        return s
+
+    def start_emitter(self):
+        # in "thread" mode the loop only publishes reports and a second thread talks to the driver
+        st = self.cfg["settings"]
+        self.emit = None
+        if st.get("emit_mode", "inline") != "thread":
+            return
+        try:
+            mb = Mailbox()
+            self.emit = Emitter(self.gp, mb, float(st.get("emit_hz", 0)), self.log)
+        except (TypeError, ValueError, ZeroDivisionError) as e:
+            self.log.error(f"Invalid emitter settings, sending reports inline: {e}")
+            return
+        self.rep.mb = mb
+        self.emit.start(self.rep.last)
+
+    def start_feedback(self):
+        # rumble and led changes arrive on driver threads whether or not mapping is running
+        try:
+            self.fb = Feedback.from_cfg(self.cfg["settings"], self.log)
+        except (TypeError, ValueError) as e:
+            self.log.error(f"Invalid feedback settings, ignoring rumble and led: {e}")
+            self.fb = None
+        if self.fb:
+            self.gp.listen(self.fb.listener())
+            self.fb.start()
+
+    def close(self):
+        if self.run:
+            self.stop_kb()
+        if self.fb:
+            self.fb.stop()
+        if self.gp:
+            self.gp.close()
+
+    def start_server(self):
+        st = self.cfg["settings"]
+        if not (st.get("server") or {}).get("enabled", False):
+            self.srv = None
+            return
+        try:
+            self.srv = RemoteServer.from_cfg(st, wake=self.inp.mark, log=self.log)
+            self.srv.start()
+        except (OSError, TypeError, ValueError) as e:
+            self.log.error(f"Failed to start input server: {e}")
+            self.srv = None
+
+    def show_stats(self):
+        print(self.dump_stats())
 
     def print_ctrl(self):
         try:
-            print("Controls:")
-            m = self.cfg["keybinds"]["movement"]
+            print(f"Controls ({self.prof} profile):")
+            m = self.pcfg["keybinds"]["movement"]
             print(f"{m['forward'].upper()}{m['left'].upper()}{m['backward'].upper()}{m['right'].upper()} - Character movement (left joystick)")
             print("Mouse - Camera/look (right joystick)")
             
-            b = self.cfg["keybinds"]["buttons"]
+            b = self.pcfg["keybinds"]["buttons"]
             for bn, k in b.items():
-                l = str(k).upper()
+                if isinstance(k, dict):
+                    l = f"{str(k.get('key')).upper()} ({k.get('mode')})"
+                else:
+                    l = str(k).upper()
                 print(f"{l} - {bn.upper()} button")
+            hk = self.cfg["settings"].get("profile_hotkey")
+            if hk and len(self.bundle.names) > 1:
+                print(f"{hk.upper()} - Next profile ({', '.join(self.bundle.names)})")
             
             print("' - Exit")
         except KeyError as e:
             self.log.error(f"Missing control configuration: {e}")
 
+    def start_multi(self):
+        if self.run or (self.eng and self.eng.run):
+            self.log.warning("Mapping already running")
+            return
+        if self.eng:
+            self.eng.close()
+            self.eng = None
+        try:
+            self.eng = Engine(self.cfg, self.log)
+        except (KeyError, ValueError, OSError) as e:
+            self.log.error(f"Invalid multi-pad configuration: {e}")
+            return
+        except Exception as e:
+            self.log.error(f"Failed to setup multi-pad engine: {e}")
+            return
+        self.eng.start()
+
     def demo(self):
         self.log.info("Running demo sequence...")
+        self.play(DEMO)
 
+    def play(self, sc):
         try:
-            self.btn_state(vg.DS4_BUTTONS.DS4_BUTTON_CROSS, True)
-            time.sleep(0.5)
-            self.btn_state(vg.DS4_BUTTONS.DS4_BUTTON_CROSS, False)
-
-            print("Moving left joystick...")
-            mvs = [(1.0, 0.0), (0.0, 1.0), (-1.0, 0.0), (0.0, -1.0)]
-            for x, y in mvs:
-                self.left_stick(x, y)
-                time.sleep(1.0)
-
-            print("Testing triggers...")
-            self.trig("l2", 1.0)
-            time.sleep(0.5)
-            self.trig("r2", 1.0)
-            time.sleep(0.5)
-
-            self.reset()
-            self.log.info("Demo sequence completed!")
-
-        except Exception as e:
-            self.log.error(f"Demo sequence failed: {e}")
+            tl = Timeline.from_script(sc, self.cfg["settings"].get("poll_rate_hz", 1000))
+        except (KeyError, TypeError, ValueError) as e:
+            self.log.error(f"Invalid script: {e}")
+            return None
+
+        self.ensure_ctrl()
+        with self.tl_lock:
+            self.tls = self.tls + [tl]
+            if not self.run and self.st is None:
+                self.st = threading.Thread(target=self.script_loop, daemon=True)
+                self.st.start()
+        if self.inp:
+            self.inp.wake.set()
+        return tl
+
+    def play_file(self):
+        p = input("Script file: ").strip()
+        if not p:
+            return
+        try:
+            sc = load_script(p)
+        except (OSError, ValueError) as e:
+            self.log.error(f"Failed to load script: {e}")
+            return
+        if self.play(sc):
+            self.log.info(f"Playing script {p}")
+
+    def run_timelines(self, now):
+        done = False
+        for tl in self.tls:
+            s = tl.frame(now)
+            if s is not None:
+                self.rep.overlay(s, tl.mode == "merge")
+            if tl.done:
+                done = True
+        if done:
+            with self.tl_lock:
+                fin = [tl for tl in self.tls if tl.done]
+                self.tls = [tl for tl in self.tls if not tl.done]
+            for tl in fin:
+                self.log.info(f"Sequence '{tl.name}' completed!")
+
+    def script_loop(self):
+        sched = TickScheduler(self.cfg["settings"].get("poll_rate_hz", 1000))
+        sched.start()
+        while True:
+            with self.tl_lock:
+                if self.run or not self.tls:
+                    self.st = None
+                    return
+            try:
+                self.run_timelines(time.perf_counter_ns())
+                self.send()
+            except Exception as e:
+                self.log.error(f"Script playback error: {e}")
+            sched.wait()
 
     def show_menu(self):
         mo = {
@@ -429,8 +838,13 @@ class ControllerEmulator:
             "4": ("Change deadzone threshold", self.change_dz),
             "5": ("Toggle relative mouse mode", self.toggle_rel_mouse),
             "6": ("Toggle cursor visibility", self.toggle_cursor),
-            "7": ("Show current config", self.show_cfg),
-            "8": ("Back to main menu", None)
+            "7": ("Toggle event-driven input mode", self.toggle_input_mode),
+            "8": ("Change polling rate", self.change_rate),
+            "9": ("Change mouse response curve", self.change_curve),
+            "10": ("Preview mouse response curve", self.show_curve),
+            "11": ("Switch binding profile", self.pick_profile),
+            "12": ("Show current config", self.show_cfg),
+            "13": ("Back to main menu", None)
         }
         
         while True:
@@ -438,7 +852,7 @@ class ControllerEmulator:
             for k, (d, _) in mo.items():
                 print(f"{k}. {d}")
             
-            c = input("Enter choice (1-8): ").strip()
+            c = input(f"Enter choice (1-{len(mo)}): ").strip()
             
             if c in mo:
                 _, a = mo[c]
@@ -467,6 +881,54 @@ class ControllerEmulator:
         except ValueError:
             print("Invalid number")
 
+    def change_rate(self):
+        try:
+            cur = self.cfg['settings'].get('poll_rate_hz', 1000)
+            nr = int(input(f"Current polling rate: {cur} Hz (125/250/500/1000)\nNew rate: "))
+            if nr <= 0:
+                print("Rate must be positive")
+                return
+            self.change_set("poll_rate_hz", nr)
+        except ValueError:
+            print("Invalid number")
+
+    def change_curve(self):
+        cur = self.cfg['settings'].get('curve') or {"type": "power"}
+        print(f"Current curve: {json.dumps(cur)}")
+        t = input(f"Curve type ({'/'.join(CURVES)}): ").strip().lower()
+        if not t:
+            return
+        try:
+            if t == "power":
+                c = {"type": t, "exponent": float(input("Exponent (1.0 = linear): ") or 1.0)}
+            elif t == "accel":
+                c = {"type": t, "accel": float(input("Acceleration per count: ") or 0.02),
+                     "cap": float(input("Maximum gain multiplier: ") or 3.0)}
+            elif t == "piecewise":
+                raw = input("Points as delta:output pairs, e.g. 0:0 10:0.3 40:1: ").split()
+                c = {"type": t, "points": [[float(a), float(b)] for a, b in (p.split(":") for p in raw)]}
+            elif t == "bezier":
+                p = [float(v) for v in input("Control points x1 y1 x2 y2: ").split()]
+                c = {"type": t, "p1": p[0:2], "p2": p[2:4]}
+                r = input("Delta at full deflection (blank = 1/sensitivity): ").strip()
+                if r:
+                    c["range"] = float(r)
+            else:
+                print("Unknown curve type")
+                return
+        except (ValueError, IndexError):
+            print("Invalid curve parameters")
+            return
+        d = self.edit()
+        dm = input("Deadzone mode (axial/radial, blank keeps current): ").strip().lower()
+        if dm in ("axial", "radial"):
+            self.change_set("deadzone_mode", dm, d)
+        if self.change_set("curve", c, d) and self.commit(d):
+            self.show_curve()
+
+    def show_curve(self):
+        print(self.curve.preview())
+
     def toggle_rel_mouse(self):
         cur = self.cfg['settings'].get('relative_mouse_mode', False)
         self.change_set("relative_mouse_mode", not cur)
@@ -475,26 +937,44 @@ class ControllerEmulator:
         cur = self.cfg['settings'].get('hide_cursor', False)
         self.change_set("hide_cursor", not cur)
 
+    def toggle_input_mode(self):
+        cur = self.cfg['settings'].get('input_mode', 'poll')
+        self.change_set("input_mode", "poll" if cur == "event" else "event")
+
+    def pick_profile(self):
+        print(f"Profiles: {', '.join(self.bundle.names)} (active: {self.prof})")
+        n = input("Switch to: ").strip()
+        if n:
+            self.switch_profile(n)
+
     def show_cfg(self):
         print(json.dumps(self.cfg, indent=2))
 
     def change_move_keys(self):
+        d = self.edit()
+        n = 0
         mvs = ["forward", "backward", "left", "right"]
         for m in mvs:
             try:
-                cur = self.cfg["keybinds"]["movement"][m]
+                cur = d["keybinds"]["movement"][m]
                 nk = input(f"Change {m} (current: {cur}): ").strip()
-                if nk:
-                    self.change_kb("movement", m, nk)
+                if nk and self.change_kb("movement", m, nk, d):
+                    n += 1
             except KeyError:
                 self.log.error(f"Missing movement key: {m}")
+        if n:
+            self.commit(d)
 
     def change_btn_keys(self):
-        for bn in self.cfg["keybinds"]["buttons"]:
+        d = self.edit()
+        n = 0
+        for bn in d["keybinds"]["buttons"]:
             try:
-                cur = self.cfg["keybinds"]["buttons"][bn]
+                cur = d["keybinds"]["buttons"][bn]
                 nk = input(f"Change {bn} (current: {cur}): ").strip()
-                if nk:
-                    self.change_kb("buttons", bn, nk)
+                if nk and self.change_kb("buttons", bn, nk, d):
+                    n += 1
             except KeyError:
                 self.log.error(f"Missing button key: {bn}")
+        if n:
+            self.commit(d)
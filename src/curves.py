@@ -0,0 +1,102 @@
+MAX_REACH = 2048
+CURVES = ("power", "accel", "piecewise", "bezier")
+
+
+def power(c, s):
+    e = float(c.get("exponent", 1.0))
+    if e <= 0:
+        raise ValueError("Curve exponent must be positive")
+    return lambda d: s * d ** e
+
+
+def accel(c, s):
+    a = float(c.get("accel", 0.02))
+    cap = float(c.get("cap", 3.0))
+    return lambda d: s * d * min(1.0 + a * d, cap)
+
+
+def piecewise(c, s):
+    pts = sorted((float(x), float(y)) for x, y in c.get("points", ()))
+    if len(pts) < 2:
+        raise ValueError("Piecewise curve needs at least two points")
+
+    def f(d):
+        if d <= pts[0][0]:
+            return pts[0][1]
+        for (x0, y0), (x1, y1) in zip(pts, pts[1:]):
+            if d <= x1:
+                return y0 + (y1 - y0) * (d - x0) / (x1 - x0) if x1 > x0 else y1
+        return pts[-1][1]
+    return f
+
+
+def bezier(c, s):
+    # cubic from (0,0) to (1,1); x is the delta as a fraction of range, y the stick output
+    (x1, y1), (x2, y2) = c.get("p1", (0.4, 0.0)), c.get("p2", (0.6, 1.0))
+    rng = float(c.get("range", 1.0 / s if s else 20.0))
+    if rng <= 0:
+        raise ValueError("Bezier curve range must be positive")
+
+    def bz(t, a, b):
+        u = 1.0 - t
+        return 3 * u * u * t * a + 3 * u * t * t * b + t * t * t
+
+    def f(d):
+        x = d / rng
+        if x >= 1.0:
+            return 1.0
+        lo, hi = 0.0, 1.0
+        for _ in range(40):
+            t = (lo + hi) / 2
+            if bz(t, x1, x2) < x:
+                lo = t
+            else:
+                hi = t
+        return bz((lo + hi) / 2, y1, y2)
+    return f
+
+
+SHAPES = {"power": power, "accel": accel, "piecewise": piecewise, "bezier": bezier}
+
+
+class Curve:
+    def __init__(self, st):
+        self.sens = float(st.get("mouse_sensitivity", 0.05))
+        self.dz = float(st.get("deadzone_threshold", 0.0))
+        self.radial = st.get("deadzone_mode", "axial") == "radial"
+        self.spec = dict(st.get("curve") or {"type": "power"})
+        t = self.spec.get("type", "power")
+        if t not in SHAPES:
+            raise ValueError(f"Unknown curve type '{t}'")
+        f = SHAPES[t](self.spec, self.sens)
+
+        vals = [0.0]
+        for d in range(1, MAX_REACH + 1):
+            v = min(1.0, max(0.0, f(d)))
+            if not self.radial and v < self.dz:
+                v = 0.0
+            vals.append(v)
+            if v >= 1.0:
+                break
+        self.r = r = len(vals) - 1
+        self.lut = tuple([-v for v in reversed(vals[1:])] + vals)
+        self.dz2 = self.dz * self.dz
+
+    def map(self, dx, dy):
+        r = self.r
+        lut = self.lut
+        sx = lut[r + (dx if -r <= dx <= r else (r if dx > 0 else -r))]
+        sy = lut[r + (dy if -r <= dy <= r else (r if dy > 0 else -r))]
+        if self.radial and sx * sx + sy * sy < self.dz2:
+            return 0.0, 0.0
+        return sx, sy
+
+    def preview(self, rows=16):
+        r = self.r
+        ds = sorted({0, r} | {round(r * (i / rows) ** 2) for i in range(1, rows)})
+        lines = [f"{self.spec.get('type', 'power')} curve, {'radial' if self.radial else 'axial'} deadzone {self.dz}, "
+                 f"{2 * r + 1} table entries (saturates at |delta| = {r})"]
+        for d in ds:
+            v = self.lut[r + d]
+            lines.append(f"{d:>6} {v:7.3f} {'#' * round(v * 40)}")
+        return "\n".join(lines)
@@ -0,0 +1,80 @@
+from .ds4 import (DPAD_NORTH, DPAD_NORTHEAST, DPAD_EAST, DPAD_SOUTHEAST, DPAD_SOUTH,
+                  DPAD_SOUTHWEST, DPAD_WEST, DPAD_NORTHWEST, DPAD_NONE)
+
+# bit order matches Binds.dpad
+UP = 1
+DOWN = 2
+LEFT = 4
+RIGHT = 8
+ORDER = ("up", "down", "left", "right")
+
+# last pressed of each pair, kept above the four direction bits
+DOWN_LAST = 16
+RIGHT_LAST = 32
+
+DIRS = {
+    (-1, 0): DPAD_NORTH, (-1, 1): DPAD_NORTHEAST, (0, 1): DPAD_EAST, (1, 1): DPAD_SOUTHEAST,
+    (1, 0): DPAD_SOUTH, (1, -1): DPAD_SOUTHWEST, (0, -1): DPAD_WEST, (-1, -1): DPAD_NORTHWEST,
+    (0, 0): DPAD_NONE,
+}
+
+# how simultaneous opposite directions resolve: "last" lets the newer press win, "neutral"
+# cancels both, "up" keeps up over down and cancels left+right
+SOCD = ("last", "neutral", "up")
+
+
+def side(i, neg, pos, both):
+    a = i & neg
+    b = i & pos
+    if a and b:
+        return both
+    return -1 if a else 1 if b else 0
+
+
+def table(socd):
+    if socd not in SOCD:
+        raise ValueError(f"Unknown d-pad SOCD mode '{socd}'")
+    t = []
+    for i in range(64 if socd == "last" else 16):
+        if socd == "last":
+            v, h = (1 if i & DOWN_LAST else -1), (1 if i & RIGHT_LAST else -1)
+        else:
+            v, h = (-1 if socd == "up" else 0), 0
+        t.append(DIRS[side(i, UP, DOWN, v), side(i, LEFT, RIGHT, h)])
+    return bytes(t)
+
+
+class DPad:
+    __slots__ = ('t', 'last', 'prev', 'pri')
+
+    def __init__(self, socd="last"):
+        self.t = table(socd)
+        self.last = socd == "last"
+        self.prev = 0
+        self.pri = 0
+
+    def dir(self, m):
+        if not self.last:
+            return self.t[m]
+        new = m & ~self.prev
+        self.prev = m
+        if new:
+            p = self.pri
+            if new & DOWN:
+                p |= DOWN_LAST
+            elif new & UP:
+                p &= ~DOWN_LAST
+            if new & RIGHT:
+                p |= RIGHT_LAST
+            elif new & LEFT:
+                p &= ~RIGHT_LAST
+            self.pri = p
+        return self.t[m | self.pri]
+
+    def reset(self):
+        self.prev = 0
+        self.pri = 0
+
+
+def build(st):
+    return DPad(st.get("dpad_socd", "last"))
@@ -0,0 +1,39 @@
+# Report values used by the DualShock 4 target; they match vgamepad's
+# DS4_BUTTONS, DS4_SPECIAL_BUTTONS and DS4_DPAD_DIRECTIONS enums.
+
+BUTTONS = {
+    "square": 1 << 4,
+    "cross": 1 << 5,
+    "circle": 1 << 6,
+    "triangle": 1 << 7,
+    "l1": 1 << 8,
+    "r1": 1 << 9,
+    "share": 1 << 12,
+    "options": 1 << 13,
+    "l3": 1 << 14,
+    "r3": 1 << 15,
+}
+
+SPECIAL = {
+    "ps": 1 << 0,
+    "touchpad": 1 << 1,
+}
+
+TRIGGERS = ("l2", "r2")
+
+DPAD_NORTH = 0x0
+DPAD_NORTHEAST = 0x1
+DPAD_EAST = 0x2
+DPAD_SOUTHEAST = 0x3
+DPAD_SOUTH = 0x4
+DPAD_SOUTHWEST = 0x5
+DPAD_WEST = 0x6
+DPAD_NORTHWEST = 0x7
+DPAD_NONE = 0x8
+
+DPAD = {
+    "up": DPAD_NORTH,
+    "down": DPAD_SOUTH,
+    "left": DPAD_WEST,
+    "right": DPAD_EAST,
+}
@@ -0,0 +1,276 @@
+import threading
+import time
+import logging
+from .bindings import compile_binds, hit, keys, KeyIndex, EXIT_KEY
+from .backends import make_input, make_pad
+from .config import profile_cfgs, DEFAULT_PROFILE
+from .curves import Curve
+from .report import ReportBuilder
+from .scheduler import TickScheduler
+from .server import RemoteServer
+from .feedback import Feedback
+from .stats import Histogram
+from .timeline import Timeline, DEMO, load_script
+from . import dpad
+from . import motion
+from . import move
+from . import stick
+from . import timed
+
+
+class Sampler:
+    # every distinct key is read once per tick, however many pads bind it, into one bitmask
+    def __init__(self, inp):
+        self.inp = inp
+        self.ix = KeyIndex()
+        self.polls = ()
+        self.mask = 0
+        self.mouse = False
+        self.wheel = False
+        self.dx = 0
+        self.dy = 0
+        self.dw = 0
+
+    def seal(self):
+        self.polls = self.ix.polls()
+
+    def sample(self):
+        self.mask = self.inp.snapshot(self.polls)
+        if self.mouse:
+            self.dx, self.dy = self.inp.deltas()
+        if self.wheel:
+            self.dw = self.inp.scrolled()
+
+
+class Pad:
+    def __init__(self, name, cfg, smp, gp, mouse=False, tl=None):
+        self.name = name
+        self.cfg = cfg
+        self.inp = smp.inp
+        self.rep = ReportBuilder(gp)
+        self.tl = tl
+        st = cfg["settings"]
+        self.stick = stick.build(Curve(st), st) if mouse else None
+        self.dp = dpad.build(st)
+        self.mv = move.build(st)
+        self.mo = motion.build(st) if mouse else None
+        self.rep.extended(self.mo is not None)
+
+        self.move = None
+        self.walk = self.touch = ()
+        self.dpad = self.btns = self.specs = self.trigs = ()
+        self.wheels = ()
+        self.tb = ()
+        self.timers = timed.Timers()
+        if "keybinds" in cfg:
+            b = compile_binds(cfg, smp.inp.scan_codes, smp.ix)
+            self.move = b.move
+            self.dpad = b.dpad
+            self.btns = b.btns
+            self.specs = b.specs
+            self.trigs = b.trigs
+            self.walk = b.walk
+            self.touch = b.touch
+            self.wheels = move.wheels(b.wheel)
+            self.tb = timed.build(b.timed)
+
+    def fill(self, m, dx, dy, dw, now):
+        rep = self.rep
+        if self.move:
+            fw, bk, lf, rt = self.move
+            rep.left(*self.mv.step(-1 if hit(lf, m) else 1 if hit(rt, m) else 0,
+                                   -1 if hit(fw, m) else 1 if hit(bk, m) else 0,
+                                   hit(self.walk, m), now / 1e9))
+        p = self.stick
+        mo = self.mo
+        if mo:
+            mo.step(rep, dx, dy, hit(self.touch, m), self.inp, now / 1e9)
+        if p and (not mo or mo.stick):
+            p.step(dx, dy, now / 1e9)
+            rep.right(p.x, p.y)
+        d = 0
+        for i, k in enumerate(self.dpad):
+            if hit(k, m):
+                d |= 1 << i
+        rep.dpad(self.dp.dir(d))
+        for k, b in self.btns:
+            rep.btn(b, hit(k, m))
+        for k, b in self.specs:
+            rep.special(b, hit(k, m))
+        for k, t in self.trigs:
+            rep.trig(t, 1.0 if hit(k, m) else 0.0)
+        if self.tb:
+            s = now / 1e9
+            tm = self.timers
+            for t in self.tb:
+                d = hit(t.keys, m)
+                if d != t.down:
+                    t.edge(d, s, tm)
+            tm.run(s)
+            for t in self.tb:
+                t.apply(rep, s)
+        if self.wheels:
+            s = now / 1e9
+            for w in self.wheels:
+                w.feed(dw, s)
+                w.apply(rep)
+        tl = self.tl
+        if tl and not tl.done:
+            s = tl.frame(now)
+            if s is not None:
+                rep.overlay(s, tl.mode == "merge")
+
+    def reset(self):
+        self.rep.reset()
+        self.dp.reset()
+        self.mv.clear()
+        if self.mo:
+            self.mo.clear()
+        for w in self.wheels:
+            w.clear()
+        if self.stick:
+            self.stick.clear()
+
+
+def profiles(cfg):
+    # "pads" is a list of profiles; each may name a binding profile, override keybinds and
+    # settings or run a script. without it the top level config describes a single pad
+    named = profile_cfgs(cfg)
+    ps = cfg.get("pads") or [{"name": "pad1", "mouse": True}]
+    out = []
+    for n, p in enumerate(ps):
+        base = named[p.get("profile", DEFAULT_PROFILE)]
+        c = {"settings": {**base["settings"], **p.get("settings", {})}}
+        if "keybinds" in p:
+            c["keybinds"] = p["keybinds"]
+        elif "script" not in p or "profile" in p:
+            c["keybinds"] = base["keybinds"]
+        out.append((p.get("name", f"pad{n + 1}"), c, bool(p.get("mouse", False)), p.get("script")))
+    return out
+
+
+class Engine:
+    def __init__(self, cfg, log=None):
+        self.cfg = cfg
+        self.log = log or logging.getLogger('ControllerEmulator')
+        self.inp = make_input(cfg)
+        self.smp = Sampler(self.inp)
+        self.exit = keys(EXIT_KEY, self.inp.scan_codes, self.smp.ix)
+        hz = cfg["settings"].get("poll_rate_hz", 1000)
+        self.pads = []
+        for name, c, mouse, sc in profiles(cfg):
+            tl = None
+            if sc:
+                s = DEMO if sc == "demo" else load_script(sc)
+                tl = Timeline.from_script(s, hz)
+            self.pads.append(Pad(name, c, self.smp, make_pad(c), mouse, tl))
+        self.smp.seal()
+        self.fb = None
+        try:
+            self.fb = Feedback.from_cfg(cfg["settings"], self.log)
+        except (TypeError, ValueError) as e:
+            self.log.error(f"Invalid feedback settings, ignoring rumble and led: {e}")
+        if self.fb:
+            for i, p in enumerate(self.pads):
+                p.rep.gp.listen(self.fb.listener(i))
+            self.fb.start()
+        self.mouse = self.smp.mouse = any(p.stick for p in self.pads)
+        self.smp.wheel = any(p.wheels for p in self.pads)
+        self.run = False
+        self.t = None
+        self.sched = None
+        self.srv = None
+        self.tick_ns = Histogram()
+        self.ticks = 0
+
+    def tick(self):
+        pc = time.perf_counter_ns
+        t0 = pc()
+        smp = self.smp
+        smp.sample()
+        m = smp.mask
+        dx, dy = smp.dx, smp.dy
+        srv = self.srv
+        if srv:
+            srv.drain()
+        for i, p in enumerate(self.pads):
+            p.fill(m, dx, dy, smp.dw, t0)
+            if srv:
+                srv.apply(p.rep, i)
+            p.rep.flush()
+        self.tick_ns.record(pc() - t0)
+        self.ticks += 1
+        if hit(self.exit, m):
+            self.stop()
+            return False
+        return True
+
+    def start(self):
+        if self.run:
+            return
+        st = self.cfg["settings"]
+        self.run = True
+        self.inp.wheel = self.smp.wheel
+        self.inp.start()
+        if self.mouse:
+            self.inp.relative = st.get("relative_mouse_mode", False)
+            self.inp.begin_mouse()
+            if st.get("hide_cursor", False):
+                self.inp.show_cursor(False)
+        if (st.get("server") or {}).get("enabled", False):
+            try:
+                self.srv = RemoteServer.from_cfg(st, len(self.pads), self.inp.mark, self.log)
+                self.srv.start()
+            except (OSError, TypeError, ValueError) as e:
+                self.log.error(f"Failed to start input server: {e}")
+                self.srv = None
+        self.t = threading.Thread(target=self.loop, daemon=True)
+        self.t.start()
+        self.log.info(f"Multi-pad mapping started with {len(self.pads)} pads: {', '.join(p.name for p in self.pads)}")
+
+    def loop(self):
+        st = self.cfg["settings"]
+        try:
+            self.sched = TickScheduler(st.get("poll_rate_hz", 1000), st.get("spin_us", 200))
+        except (TypeError, ValueError) as e:
+            self.log.error(f"Invalid polling rate, using 1000 Hz: {e}")
+            self.sched = TickScheduler()
+        self.sched.start()
+        while self.run:
+            try:
+                if not self.tick():
+                    break
+            except Exception as e:
+                self.log.error(f"Multi-pad tick error: {e}")
+            self.sched.wait()
+
+    def stop(self):
+        if not self.run:
+            return
+        self.run = False
+        self.inp.stop()
+        if self.mouse and self.cfg["settings"].get("hide_cursor", False):
+            self.inp.show_cursor(True)
+        if self.t and self.t.is_alive() and self.t is not threading.current_thread():
+            self.t.join(timeout=1.0)
+        for p in self.pads:
+            p.reset()
+        if self.srv:
+            self.srv.stop()
+            self.log.info(self.srv.summary())
+        self.log.info("Multi-pad mapping stopped!")
+        self.log.info(self.summary())
+
+    def close(self):
+        self.stop()
+        if self.fb:
+            self.fb.stop()
+            self.log.info(self.fb.summary())
+        for p in self.pads:
+            p.rep.gp.close()
+
+    def summary(self):
+        h = self.tick_ns
+        sent = sum(p.rep.sent for p in self.pads)
+        return (f"{len(self.pads)} pads, {self.ticks} ticks, {len(self.smp.polls)} keys sampled per tick, "
+                f"{sent} reports sent, tick p50 {h.pct(50) / 1000:.1f} us p99 {h.pct(99) / 1000:.1f} us")
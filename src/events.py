@@ -0,0 +1,51 @@
+import keyboard
+import mouse
+from .winbackend import WinInput
+
+
+class EventInput(WinInput):
+    evented = True
+
+    def __init__(self):
+        super().__init__()
+        self.down = set()
+
+    def start(self):
+        self.down.clear()
+        self.wh.clear()
+        self.hook()
+
+    def on_key(self, e):
+        if e.event_type == keyboard.KEY_DOWN:
+            self.down.add(e.scan_code)
+        else:
+            self.down.discard(e.scan_code)
+        super().on_key(e)
+        self.mark()
+
+    def on_mouse(self, e):
+        if isinstance(e, mouse.ButtonEvent):
+            if e.event_type == mouse.UP:
+                self.down.discard(e.button)
+            else:
+                self.down.add(e.button)
+            super().on_mouse(e)
+            self.mark()
+            return
+        super().on_mouse(e)
+
+    def snapshot(self, polls):
+        # one copy of the set, so a key event landing mid-tick cannot split the view
+        d = set(self.down)
+        m = 0
+        for b, t in polls:
+            if t in d:
+                m |= b
+        return m
+
+    def pressed(self, k):
+        d = self.down
+        for c in k:
+            if c in d:
+                return True
+        return False
@@ -0,0 +1,193 @@
+import json
+import os
+import shlex
+import subprocess
+import threading
+import time
+from collections import deque
+from .stats import Histogram
+
+SINKS = ("log", "stats", "script")
+RESTARTS = 5
+
+
+class LogSink:
+    def __init__(self, log):
+        self.log = log
+
+    def __call__(self, e):
+        t, pad, large, small, led = e
+        self.log.info(f"Feedback pad {pad}: rumble {large}/{small}, led {led}")
+
+
+class StatsSink:
+    def __init__(self):
+        self.n = 0
+        self.rumble = 0
+        self.light = 0
+        self.last = None
+        self.lag = Histogram()
+
+    def __call__(self, e):
+        l = self.last
+        self.n += 1
+        if l is None or e[2:4] != l[2:4]:
+            self.rumble += 1
+        if l is None or e[4] != l[4]:
+            self.light += 1
+        self.last = e
+        self.lag.record(time.perf_counter_ns() - e[0])
+
+    def summary(self):
+        return (f"{self.n} events, {self.rumble} rumble and {self.light} led changes, "
+                f"dispatch p50 {self.lag.pct(50) / 1000:.1f} us p99 {self.lag.pct(99) / 1000:.1f} us")
+
+
+class ScriptSink:
+    # one long-running process reads a json line per event on stdin. a script that keeps
+    # exiting is restarted with a growing delay and given up on after RESTARTS tries
+    def __init__(self, cmd, log):
+        self.cmd = cmd
+        self.log = log
+        self.p = None
+        self.fails = 0
+        self.next = 0.0
+        self.dead = False
+
+    def open(self):
+        # Windows takes a command line as is; splitting it would keep or eat quotes and backslashes
+        cmd = self.cmd if os.name == 'nt' else shlex.split(self.cmd)
+        self.p = subprocess.Popen(cmd, stdin=subprocess.PIPE, text=True)
+
+    def fail(self, now):
+        self.p = None
+        self.fails += 1
+        if self.fails >= RESTARTS:
+            self.dead = True
+            if self.log:
+                self.log.error(f"Feedback script keeps exiting, disabled: {self.cmd}")
+            return
+        self.next = now + min(30.0, 0.5 * 2 ** self.fails)
+
+    def __call__(self, e):
+        if self.dead:
+            return
+        p = self.p
+        if p is None or p.poll() is not None:
+            now = time.monotonic()
+            if p is not None:
+                self.fail(now)
+                if self.dead:
+                    return
+            if now < self.next:
+                return
+            try:
+                self.open()
+            except OSError:
+                self.fail(now)
+                raise
+        else:
+            self.fails = 0
+        t, pad, large, small, led = e
+        self.p.stdin.write(json.dumps({"pad": pad, "large": large, "small": small, "led": led}) + "\n")
+        self.p.stdin.flush()
+
+    def close(self):
+        p = self.p
+        self.p = None
+        if p is None:
+            return
+        try:
+            p.stdin.close()
+            p.wait(timeout=1.0)
+        except (OSError, subprocess.TimeoutExpired):
+            p.kill()
+
+
+class Feedback:
+    # driver callbacks only append to a bounded deque and set an event, so they never wait
+    # on the mapping loop or on a slow sink; a full queue drops its oldest entries
+    def __init__(self, sinks, maxlen=256, log=None):
+        self.sinks = sinks
+        self.q = deque(maxlen=maxlen)
+        self.ev = threading.Event()
+        self.log = log
+        self.run = False
+        self.t = None
+        self.received = 0
+        self.dropped = 0
+        self.errors = 0
+        self.stats = next((s for s in sinks if isinstance(s, StatsSink)), None)
+
+    @classmethod
+    def from_cfg(cls, st, log=None):
+        c = st.get("feedback") or {}
+        if not c.get("enabled", True):
+            return None
+        sinks = []
+        for n in c.get("sinks", ["stats"]):
+            if n not in SINKS:
+                raise ValueError(f"Unknown feedback sink '{n}'")
+            if n == "log":
+                sinks.append(LogSink(log))
+            elif n == "stats":
+                sinks.append(StatsSink())
+            elif c.get("script"):
+                sinks.append(ScriptSink(c["script"], log))
+            else:
+                raise ValueError("The script feedback sink needs feedback.script")
+        return cls(sinks, int(c.get("queue", 256)), log)
+
+    def listener(self, pad=0):
+        def push(large, small, led):
+            q = self.q
+            if len(q) == q.maxlen:
+                self.dropped += 1
+            q.append((time.perf_counter_ns(), pad, large, small, led))
+            self.received += 1
+            self.ev.set()
+        return push
+
+    def start(self):
+        if self.run:
+            return
+        self.run = True
+        self.t = threading.Thread(target=self.loop, daemon=True)
+        self.t.start()
+
+    def stop(self):
+        self.run = False
+        self.ev.set()
+        if self.t and self.t.is_alive() and self.t is not threading.current_thread():
+            self.t.join(timeout=1.0)
+        self.drain()
+        for s in self.sinks:
+            if isinstance(s, ScriptSink):
+                s.close()
+
+    def loop(self):
+        while self.run:
+            self.ev.wait(0.5)
+            self.ev.clear()
+            self.drain()
+
+    def drain(self):
+        q = self.q
+        while q:
+            try:
+                e = q.popleft()
+            except IndexError:
+                break
+            for s in self.sinks:
+                try:
+                    s(e)
+                except Exception as ex:
+                    self.errors += 1
+                    if self.log:
+                        self.log.error(f"Feedback sink failed: {ex}")
+
+    def summary(self):
+        s = f"feedback: {self.received} received, {self.dropped} dropped, {self.errors} sink errors"
+        if self.stats:
+            s += ", " + self.stats.summary()
+        return s
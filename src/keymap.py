@@ -0,0 +1,25 @@
+# PC scan code set 1, as reported by the keyboard library on Windows. Used to
+# resolve key names for backends that do not go through the keyboard library.
+SCAN_CODES = {
+    'esc': 1, '1': 2, '2': 3, '3': 4, '4': 5, '5': 6, '6': 7, '7': 8, '8': 9, '9': 10, '0': 11,
+    '-': 12, '=': 13, 'backspace': 14, 'tab': 15,
+    'q': 16, 'w': 17, 'e': 18, 'r': 19, 't': 20, 'y': 21, 'u': 22, 'i': 23, 'o': 24, 'p': 25,
+    '[': 26, ']': 27, 'enter': (28, 284), 'ctrl': (29, 285),
+    'a': 30, 's': 31, 'd': 32, 'f': 33, 'g': 34, 'h': 35, 'j': 36, 'k': 37, 'l': 38,
+    ';': 39, "'": 40, '`': 41, 'shift': (42, 54), '\\': 43,
+    'z': 44, 'x': 45, 'c': 46, 'v': 47, 'b': 48, 'n': 49, 'm': 50, ',': 51, '.': 52, '/': 53,
+    'alt': (56, 312), 'space': 57, 'caps lock': 58,
+    'f1': 59, 'f2': 60, 'f3': 61, 'f4': 62, 'f5': 63, 'f6': 64, 'f7': 65, 'f8': 66, 'f9': 67, 'f10': 68,
+    'f11': 87, 'f12': 88,
+    'home': 71, 'up': 72, 'page up': 73, 'left': 75, 'right': 77, 'end': 79, 'down': 80,
+    'page down': 81, 'insert': 82, 'delete': 83,
+    'left shift': 42, 'right shift': 54, 'left ctrl': 29, 'right ctrl': 285,
+    'left alt': 56, 'right alt': 312,
+}
+
+
+def scan_codes(name):
+    c = SCAN_CODES.get(str(name).lower())
+    if c is None:
+        raise ValueError(f"Key {name!r} is not mapped to any known key.")
+    return c if isinstance(c, tuple) else (c,)
@@ -0,0 +1,103 @@
+import threading
+import time
+from .stats import Histogram
+
+
+class Mailbox:
+    # single slot, latest wins. one writer, one reader: put never blocks and simply replaces
+    # whatever the reader has not picked up yet; the sequence number tells the reader if
+    # anything new arrived, so nothing is ever cleared and no update can be lost
+    def __init__(self):
+        self.v = None
+        self.seq = 0
+        self.seen = 0
+        self.ev = threading.Event()
+
+    def put(self, v):
+        self.v = v
+        self.seq += 1
+        self.ev.set()
+
+    def take(self, timeout=None):
+        s = self.seq
+        if s == self.seen:
+            self.ev.wait(timeout)
+            self.ev.clear()
+            s = self.seq
+            if s == self.seen:
+                return None
+        v = self.v
+        self.seen = s
+        return v
+
+    def dropped(self, taken):
+        return self.seq - taken
+
+
+class Emitter:
+    def __init__(self, pad, mb, hz=0, log=None):
+        self.pad = pad
+        self.mb = mb
+        self.period = 1.0 / hz if hz else 0.0
+        self.log = log
+        self.last = None
+        self.run = False
+        self.t = None
+        self.taken = 0
+        self.sent = 0
+        self.submit = Histogram()
+
+    def start(self, last):
+        self.last = last
+        self.run = True
+        self.t = threading.Thread(target=self.loop, daemon=True)
+        self.t.start()
+
+    def stop(self):
+        self.run = False
+        self.mb.ev.set()
+        if self.t and self.t.is_alive() and self.t is not threading.current_thread():
+            self.t.join(timeout=1.0)
+            if self.t.is_alive():
+                # still stuck in the driver; a second caller would only race it
+                if self.log:
+                    self.log.warning("Emitter thread did not stop, skipping the final report")
+                return False
+        # whatever was published last still has to reach the pad
+        self.emit(self.mb.take(0))
+        return True
+
+    def emit(self, s):
+        if s is None:
+            return
+        self.taken += 1
+        if s == self.last:
+            return
+        t = time.perf_counter_ns()
+        try:
+            self.pad.submit(s, self.last)
+        except Exception as e:
+            if self.log:
+                self.log.error(f"Failed to send controller report: {e}")
+            return
+        self.submit.record(time.perf_counter_ns() - t)
+        self.last = s
+        self.sent += 1
+
+    def loop(self):
+        p = self.period
+        nxt = time.perf_counter()
+        while self.run:
+            self.emit(self.mb.take(0.1))
+            if p:
+                nxt += p
+                d = nxt - time.perf_counter()
+                if d > 0:
+                    time.sleep(d)
+                else:
+                    nxt = time.perf_counter()
+
+    def summary(self):
+        h = self.submit
+        return (f"emitter: {self.sent} reports submitted, {self.mb.dropped(self.taken)} superseded states dropped, "
+                f"submit p50 {h.pct(50) / 1000:.1f} us p99 {h.pct(99) / 1000:.1f} us max {h.max / 1000:.1f} us")
@@ -0,0 +1,66 @@
+# Mouse driven DS4 motion sensors and touchpad for the extended report.
+# DS4 gyro counts are 16 per deg/s and the accelerometer reads 8192 per g.
+GYRO_RES = 16
+ACCEL_1G = 8192
+TOUCH_W = 1920
+TOUCH_H = 943
+UP = 0x80
+
+MOUSE = ("gyro", "stick", "both")
+
+
+def clamp16(v):
+    v = int(v)
+    return -32768 if v < -32768 else 32767 if v > 32767 else v
+
+
+class Motion:
+    # mouse motion becomes pitch and yaw rates; the pad is otherwise held flat and still
+    __slots__ = ('sens', 'sx', 'sy', 'stick', 'min_dt', 'last', 'tid', 'down')
+
+    def __init__(self, sens=0.1, invert_x=False, invert_y=False, mouse="gyro", hz=1000):
+        if mouse not in MOUSE:
+            raise ValueError(f"Unknown gyro mouse mode '{mouse}'")
+        self.sens = sens * GYRO_RES
+        self.sx = 1 if invert_x else -1
+        self.sy = 1 if invert_y else -1
+        self.stick = mouse != "gyro"
+        self.min_dt = 1.0 / hz if hz else 0.001
+        self.last = None
+        self.tid = 0
+        self.down = False
+
+    def step(self, rep, dx, dy, touch, inp, now):
+        l = self.last
+        self.last = now
+        if l is None or not (dx or dy):
+            rep.gx = rep.gy = 0
+        else:
+            # sens is deg per pixel, so pixels per second give deg/s
+            k = self.sens / max(now - l, self.min_dt)
+            rep.gx = clamp16(self.sy * dy * k)
+            rep.gy = clamp16(self.sx * dx * k)
+        if touch:
+            if not self.down:
+                self.down = True
+                self.tid = (self.tid + 1) & 0x7F
+            x, y = inp.get_position()
+            w, h = inp.screen_size()
+            rep.tc = self.tid
+            rep.tx = min(TOUCH_W - 1, max(0, x * TOUCH_W // w))
+            rep.ty = min(TOUCH_H - 1, max(0, y * TOUCH_H // h))
+        elif self.down:
+            self.down = False
+            rep.tc = self.tid | UP
+
+    def clear(self):
+        self.last = None
+        self.down = False
+
+
+def build(st):
+    if not st.get("ds4_extended", False):
+        return None
+    c = st.get("gyro") or {}
+    return Motion(float(c.get("sensitivity", 0.1)), bool(c.get("invert_x", False)),
+                  bool(c.get("invert_y", False)), c.get("mouse", "gyro"), st.get("poll_rate_hz", 1000))
@@ -0,0 +1,146 @@
+import math
+
+RAMPS = ("linear", "smooth", "quad")
+WHEEL_TARGETS = ("l2", "r2", "lx", "ly", "rx", "ry")
+STEPS = 64
+
+
+def ramp(kind):
+    if kind not in RAMPS:
+        raise ValueError(f"Unknown movement ramp '{kind}'")
+    f = {"linear": lambda t: t, "smooth": lambda t: t * t * (3 - 2 * t), "quad": lambda t: t * t}[kind]
+    return tuple(f(i / STEPS) for i in range(STEPS + 1))
+
+
+class Axis:
+    # k is how far along the ramp table the axis is, in table steps; pressing walks it up,
+    # releasing or reversing walks it back down, so the value is one table read
+    __slots__ = ('t', 'up', 'dn', 's', 'k')
+
+    def __init__(self, t, up, dn):
+        self.t = t
+        self.up = up
+        self.dn = dn
+        self.s = 0
+        self.k = 0.0
+
+    def step(self, d, dt):
+        k = self.k
+        if d and (d == self.s or k <= 0.0):
+            self.s = d
+            k = STEPS if self.up is None else min(STEPS, k + dt * self.up)
+        elif k:
+            k = 0.0 if self.dn is None else max(0.0, k - dt * self.dn)
+        self.k = k
+        return self.s * self.t[int(k)]
+
+    def busy(self, d):
+        return self.k < STEPS if d and d == self.s else self.k > 0.0
+
+
+class Move:
+    def __init__(self, up_ms=0.0, down_ms=0.0, kind="linear", normalize=True, walk=0.5, step=0.001):
+        rate = lambda ms: STEPS * 1000.0 / ms if ms > 0 else None
+        t = ramp(kind)
+        self.x = Axis(t, rate(up_ms), rate(down_ms))
+        self.y = Axis(t, rate(up_ms), rate(down_ms))
+        self.ramps = up_ms > 0 or down_ms > 0
+        self.norm = normalize
+        self.walk = walk
+        # a tick never advances a ramp by more than two tick periods, so waking from idle
+        # does not jump it; the first tick after a rest counts as one period
+        self.period = step
+        self.cap = 2 * step
+        self.last = None
+        self.active = False
+
+    def step(self, dx, dy, walk, now):
+        if self.ramps:
+            dt = self.period if self.last is None else min(now - self.last, self.cap)
+            self.last = now
+            x = self.x.step(dx, dt)
+            y = self.y.step(dy, dt)
+            self.active = self.x.busy(dx) or self.y.busy(dy)
+        else:
+            x, y = float(dx), float(dy)
+        if self.norm:
+            m = x * x + y * y
+            if m > 1.0:
+                m = 1.0 / math.sqrt(m)
+                x *= m
+                y *= m
+        if walk:
+            x *= self.walk
+            y *= self.walk
+        return x, y
+
+    def wake(self, step):
+        return step if self.active else None
+
+    def clear(self):
+        for a in (self.x, self.y):
+            a.s = 0
+            a.k = 0.0
+        self.last = None
+        self.active = False
+
+
+class Wheel:
+    # wheel notches accumulate into one analog value that eases back to rest over `ret` seconds;
+    # hot stays set until the rest value has been written once, as nothing else resets the field
+    __slots__ = ('target', 'step', 'ret', 'lo', 'v', 'last', 'hot')
+
+    def __init__(self, target, step, ret):
+        self.target = target
+        self.step = step
+        self.ret = ret
+        self.lo = 0.0 if target in ("l2", "r2") else -1.0
+        self.v = 0.0
+        self.last = None
+        self.hot = False
+
+    def feed(self, d, now):
+        v = self.v
+        if v and self.ret and self.last is not None:
+            r = (now - self.last) / self.ret
+            v = max(0.0, v - r) if v > 0 else min(0.0, v + r)
+        self.last = now
+        if d:
+            v = min(1.0, max(self.lo, v + d * self.step))
+        self.v = v
+
+    def apply(self, rep):
+        v = self.v
+        if v:
+            self.hot = True
+        elif self.hot:
+            self.hot = False
+        else:
+            return
+        t = self.target
+        if t == "l2" or t == "r2":
+            rep.trig(t, v)
+        else:
+            rep.set_axis(t, v)
+
+    def clear(self):
+        self.v = 0.0
+        self.last = None
+
+
+def build(st):
+    c = st.get("movement") or {}
+    hz = st.get("poll_rate_hz", 1000)
+    return Move(float(c.get("ramp_up_ms", 0)), float(c.get("ramp_down_ms", 0)), c.get("ramp", "linear"),
+                bool(c.get("normalize", True)), float(c.get("walk_scale", 0.5)), 1.0 / hz if hz else 0.001)
+
+
+def wheels(entries):
+    return tuple(Wheel(t, s, r) for t, s, r in entries)
+
+
+def wake(ws, step):
+    for w in ws:
+        if w.v and w.ret:
+            return step
+    return None
@@ -0,0 +1,126 @@
+import struct
+import threading
+import time
+from collections import namedtuple
+from .backends import LoopbackInput
+from .scheduler import TickScheduler
+
+MAGIC = b'CEREC\x00\x01\x00'
+HEADER = struct.Struct('<8sQ')
+# t_ns since start, kind, code, a, b -- 20 bytes per record
+RECORD = struct.Struct('<QBxHii')
+
+KEY_DOWN = 0
+KEY_UP = 1
+BTN_DOWN = 2
+BTN_UP = 3
+MOVE = 4
+POS = 5
+WHEEL = 6
+
+# wheel deltas are stored in Windows' 1/120 notch units so high resolution wheels survive
+WHEEL_DELTA = 120
+
+BTN_CODES = ('left', 'right', 'middle', 'x1', 'x2', 'x')
+
+Record = namedtuple('Record', 't kind code a b')
+
+
+class Recorder:
+    def __init__(self, path):
+        self.path = path
+        self.f = open(path, 'wb')
+        self.f.write(HEADER.pack(MAGIC, time.time_ns()))
+        self.lock = threading.Lock()
+        self.t0 = time.perf_counter_ns()
+        self.count = 0
+
+    def write(self, kind, code=0, a=0, b=0):
+        with self.lock:
+            if self.f is None:
+                return
+            self.f.write(RECORD.pack(time.perf_counter_ns() - self.t0, kind, code, a, b))
+            self.count += 1
+
+    def key(self, code, down):
+        self.write(KEY_DOWN if down else KEY_UP, code)
+
+    def button(self, b, down):
+        if b in BTN_CODES:
+            self.write(BTN_DOWN if down else BTN_UP, BTN_CODES.index(b))
+
+    def move(self, x, y):
+        self.write(POS, 0, x, y)
+
+    def motion(self, dx, dy):
+        self.write(MOVE, 0, dx, dy)
+
+    def scroll(self, d):
+        self.write(WHEEL, 0, round(d * WHEEL_DELTA))
+
+    def close(self):
+        with self.lock:
+            if self.f is not None:
+                self.f.close()
+                self.f = None
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise ValueError(f"'{path}' is not a session recording")
+    magic, _ = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"'{path}' is not a session recording")
+    n = (len(data) - HEADER.size) // RECORD.size
+    return [Record(*r) for r in RECORD.iter_unpack(data[HEADER.size:HEADER.size + n * RECORD.size])]
+
+
+def apply(inp, r):
+    k = r.kind
+    if k == KEY_DOWN or k == KEY_UP:
+        inp.key(r.code, k == KEY_DOWN)
+    elif k == BTN_DOWN or k == BTN_UP:
+        inp.button(BTN_CODES[r.code], k == BTN_DOWN)
+    elif k == MOVE:
+        inp.motion(r.a, r.b)
+    elif k == POS:
+        inp.pos = (r.a, r.b)
+    elif k == WHEEL:
+        inp.scroll(r.a / WHEEL_DELTA)
+
+
+def replay(emu, path, realtime=False, tail_ms=100):
+    recs = read(path)
+    hz = emu.cfg["settings"].get("poll_rate_hz", 1000)
+    sched = TickScheduler(hz)
+    period = sched.period
+
+    inp = LoopbackInput(size=emu.inp.screen_size())
+    for r in recs:
+        if r.kind == POS:
+            inp.pos = (r.a, r.b)
+            break
+    old = emu.inp, emu.clock
+    vt = 0
+    emu.inp = inp
+    emu.clock = lambda: vt / 1e9
+
+    i, n, ticks = 0, len(recs), 0
+    end = (recs[-1].t if recs else 0) + tail_ms * 1_000_000
+    if realtime:
+        sched.start()
+    try:
+        while vt <= end:
+            while i < n and recs[i].t <= vt:
+                apply(inp, recs[i])
+                i += 1
+            emu.tick()
+            ticks += 1
+            vt += period
+            if realtime:
+                sched.wait()
+    finally:
+        emu.inp, emu.clock = old
+    return ticks
@@ -0,0 +1,175 @@
+from array import array
+from .ds4 import DPAD_NONE
+from .motion import ACCEL_1G, UP
+
+
+def axis(v):
+    if v <= -1.0:
+        return 0
+    if v >= 1.0:
+        return 255
+    return round((v + 1.0) * 127.5)
+
+
+def neutral():
+    return (128, 128, 128, 128, 0, 0, 0, 0, DPAD_NONE)
+
+
+def trigger(v):
+    if v <= 0.0:
+        return 0
+    if v >= 1.0:
+        return 255
+    return round(v * 255)
+
+
+class ReportBuilder:
+    def __init__(self, pad):
+        self.gp = pad
+        self.mb = None
+        self.sent = 0
+        self.suppressed = 0
+        self.ext = False
+        # extended reports go through these two preallocated arrays instead of a tuple per tick
+        self.xs = array('i', bytes(4 * 18))
+        self.xl = array('i', [-1] * 18)
+        self.clear()
+        self.clear_ext()
+        self.last = self.state()
+
+    def clear(self):
+        self.lx = 128
+        self.ly = 128
+        self.rx = 128
+        self.ry = 128
+        self.l2 = 0
+        self.r2 = 0
+        self.btns = 0
+        self.spec = 0
+        self.dp = DPAD_NONE
+
+    def clear_ext(self):
+        # extended report only: gyro, accelerometer and the touch contact (tc is the
+        # tracking id, with UP set while nothing touches)
+        self.gx = self.gy = self.gz = 0
+        self.ax = self.az = 0
+        self.ay = ACCEL_1G
+        self.tc = UP
+        self.tx = self.ty = 0
+
+    def extended(self, on):
+        self.ext = on
+        self.xl[:] = array('i', [-1] * 18)
+
+    def state(self):
+        if self.ext:
+            return (self.lx, self.ly, self.rx, self.ry, self.l2, self.r2, self.btns, self.spec, self.dp,
+                    self.gx, self.gy, self.gz, self.ax, self.ay, self.az, self.tc, self.tx, self.ty)
+        return (self.lx, self.ly, self.rx, self.ry, self.l2, self.r2, self.btns, self.spec, self.dp)
+
+    def left(self, x, y):
+        self.lx = axis(x)
+        self.ly = axis(y)
+
+    def right(self, x, y):
+        self.rx = axis(x)
+        self.ry = axis(y)
+
+    def set_axis(self, a, v):
+        # a single stick axis by field name, for inputs that drive one axis alone
+        setattr(self, a, axis(v))
+
+    def trig(self, t, v):
+        if t == "l2":
+            self.l2 = trigger(v)
+        elif t == "r2":
+            self.r2 = trigger(v)
+
+    def btn(self, b, pressed):
+        if pressed:
+            self.btns |= b
+        else:
+            self.btns &= ~b
+
+    def special(self, b, pressed):
+        if pressed:
+            self.spec |= b
+        else:
+            self.spec &= ~b
+
+    def dpad(self, d):
+        self.dp = d
+
+    def overlay(self, s, merge=False):
+        if not merge:
+            self.lx, self.ly, self.rx, self.ry, self.l2, self.r2, self.btns, self.spec, self.dp = s
+            return
+        if s[0] != 128 or s[1] != 128:
+            self.lx, self.ly = s[0], s[1]
+        if s[2] != 128 or s[3] != 128:
+            self.rx, self.ry = s[2], s[3]
+        if s[4] > self.l2:
+            self.l2 = s[4]
+        if s[5] > self.r2:
+            self.r2 = s[5]
+        self.btns |= s[6]
+        self.spec |= s[7]
+        if s[8] != DPAD_NONE:
+            self.dp = s[8]
+
+    def flush(self):
+        if self.ext:
+            return self.flush_ext()
+        s = self.state()
+        if s == self.last:
+            self.suppressed += 1
+            return False
+        if self.mb:
+            self.mb.put(s)
+        else:
+            self.gp.submit(s, self.last)
+        self.last = s
+        self.sent += 1
+        return True
+
+    def flush_ext(self):
+        x = self.xs
+        x[0] = self.lx
+        x[1] = self.ly
+        x[2] = self.rx
+        x[3] = self.ry
+        x[4] = self.l2
+        x[5] = self.r2
+        x[6] = self.btns
+        x[7] = self.spec
+        x[8] = self.dp
+        x[9] = self.gx
+        x[10] = self.gy
+        x[11] = self.gz
+        x[12] = self.ax
+        x[13] = self.ay
+        x[14] = self.az
+        x[15] = self.tc
+        x[16] = self.tx
+        x[17] = self.ty
+        l = self.xl
+        if x == l:
+            self.suppressed += 1
+            return False
+        if self.mb:
+            # the emitter thread needs a copy that the next tick cannot change
+            self.mb.put(tuple(x))
+        else:
+            self.gp.submit(x, l)
+        l[:] = x
+        self.last = l
+        self.sent += 1
+        return True
+
+    def reset(self):
+        self.clear()
+        self.clear_ext()
+        self.gp.reset()
+        self.last = self.state()
+        self.xl[:] = array('i', [-1] * 18)
+        self.sent += 1
@@ -0,0 +1,47 @@
+import time
+
+
+class TickScheduler:
+    def __init__(self, hz=1000, spin_us=200):
+        self.hz = 0
+        self.period = 0
+        self.spin = int(spin_us * 1000)
+        self.next = 0
+        self.ticks = 0
+        self.overruns = 0
+        self.max_late = 0
+        self.set_rate(hz)
+
+    def set_rate(self, hz):
+        hz = float(hz)
+        if hz <= 0:
+            raise ValueError(f"Tick rate must be positive, got {hz}")
+        self.hz = hz
+        self.period = int(1_000_000_000 / hz)
+
+    def start(self):
+        self.ticks = 0
+        self.overruns = 0
+        self.max_late = 0
+        self.next = time.perf_counter_ns() + self.period
+
+    def wait(self):
+        dl = self.next
+        now = time.perf_counter_ns()
+        self.ticks += 1
+
+        if now >= dl:
+            late = now - dl
+            self.overruns += 1
+            if late > self.max_late:
+                self.max_late = late
+            # more than a whole period behind: start a fresh schedule rather than bursting to catch up
+            self.next = now + self.period if late >= self.period else dl + self.period
+            return
+
+        rem = dl - now - self.spin
+        if rem > 0:
+            time.sleep(rem / 1e9)
+        while time.perf_counter_ns() < dl:
+            pass
+        self.next = dl + self.period
@@ -0,0 +1,224 @@
+import asyncio
+import math
+import struct
+import threading
+from collections import deque
+from .ds4 import BUTTONS, SPECIAL, DPAD_NONE
+from .report import axis, trigger, neutral
+
+# flags, pad, buttons, special, dpad, lx, ly, rx, ry, l2, r2 -- 30 bytes, little endian
+FRAME = struct.Struct('<BBHBBffffff')
+
+LEFT = 1
+RIGHT = 2
+TRIGS = 4
+BTNS = 8
+DPAD = 16
+ALL = LEFT | RIGHT | TRIGS | BTNS | DPAD
+
+# bits 0-3 of the DS4 button word are the d-pad, so only real buttons get through
+BTN_MASK = sum(BUTTONS.values())
+SPEC_MASK = sum(SPECIAL.values())
+
+
+def pack(pad=0, flags=ALL, btns=0, spec=0, dp=DPAD_NONE, lx=0.0, ly=0.0, rx=0.0, ry=0.0, l2=0.0, r2=0.0):
+    return FRAME.pack(flags, pad, btns, spec, dp, lx, ly, rx, ry, l2, r2)
+
+
+class Remote:
+    # the state one client has built up for a pad; fields a frame does not flag keep their value
+    __slots__ = ('s', 'lb', 'ls', 'live')
+
+    def __init__(self):
+        self.s = list(neutral())
+        self.lb = 0
+        self.ls = 0
+        self.live = False
+
+    def feed(self, f):
+        # a frame with a non-finite value or an impossible d-pad is rejected whole
+        fl = f[0]
+        fin = math.isfinite
+        if fl & LEFT and not (fin(f[5]) and fin(f[6])):
+            return False
+        if fl & RIGHT and not (fin(f[7]) and fin(f[8])):
+            return False
+        if fl & TRIGS and not (fin(f[9]) and fin(f[10])):
+            return False
+        if fl & DPAD and f[4] > DPAD_NONE:
+            return False
+        s = self.s
+        if fl & LEFT:
+            s[0] = axis(f[5])
+            s[1] = axis(f[6])
+        if fl & RIGHT:
+            s[2] = axis(f[7])
+            s[3] = axis(f[8])
+        if fl & TRIGS:
+            s[4] = trigger(f[9])
+            s[5] = trigger(f[10])
+        if fl & BTNS:
+            b = f[2] & BTN_MASK
+            sp = f[3] & SPEC_MASK
+            s[6] = b
+            s[7] = sp
+            # a press and release inside one batch still shows up for one tick
+            self.lb |= b
+            self.ls |= sp
+        if fl & DPAD:
+            s[8] = f[4]
+        self.live = True
+        return True
+
+    def apply(self, rep):
+        if not self.live:
+            return False
+        s = self.s
+        rep.overlay((s[0], s[1], s[2], s[3], s[4], s[5], s[6] | self.lb, s[7] | self.ls, s[8]), True)
+        tap = self.lb & ~s[6] or self.ls & ~s[7]
+        self.lb = self.ls = 0
+        return tap
+
+
+class Datagrams(asyncio.DatagramProtocol):
+    def __init__(self, srv):
+        self.srv = srv
+
+    def datagram_received(self, data, addr):
+        self.srv.feed(data)
+
+
+class RemoteServer:
+    def __init__(self, host="127.0.0.1", port=7777, udp=True, maxlen=1024, pads=1, wake=None, log=None):
+        self.host = host
+        self.port = port
+        self.udp = udp
+        self.q = deque(maxlen=maxlen)
+        self.pads = [Remote() for _ in range(pads)]
+        self.wake = wake
+        self.log = log
+        self.received = 0
+        self.dropped = 0
+        self.bad = 0
+        self.applied = 0
+        self.batches = 0
+        self.depth = 0
+        self.max_depth = 0
+        self.loop = None
+        self.done = None
+        self.t = None
+        self.ready = threading.Event()
+        self.err = None
+
+    @classmethod
+    def from_cfg(cls, st, pads=1, wake=None, log=None):
+        c = st.get("server") or {}
+        return cls(c.get("host", "127.0.0.1"), int(c.get("port", 7777)), bool(c.get("udp", True)),
+                   int(c.get("queue", 1024)), pads, wake, log)
+
+    def feed(self, data):
+        n = len(data) // FRAME.size * FRAME.size
+        if n != len(data):
+            self.bad += 1
+        q = self.q
+        for f in FRAME.iter_unpack(data[:n]):
+            if len(q) == q.maxlen:
+                self.dropped += 1
+            q.append(f)
+            self.received += 1
+        if n and self.wake:
+            self.wake()
+
+    def drain(self):
+        # called once per tick on the loop thread; everything queued so far is one batch
+        q = self.q
+        n = len(q)
+        self.depth = n
+        if not n:
+            return 0
+        if n > self.max_depth:
+            self.max_depth = n
+        ps = self.pads
+        for _ in range(n):
+            f = q.popleft()
+            i = f[1]
+            if i >= len(ps) or not ps[i].feed(f):
+                self.bad += 1
+        self.applied += n
+        self.batches += 1
+        return n
+
+    def apply(self, rep, i=0):
+        # a tap that was only latched needs one more tick to be released
+        if self.pads[i].apply(rep) and self.wake:
+            self.wake()
+
+    def merge(self, rep):
+        self.drain()
+        self.apply(rep)
+
+    async def client(self, r, w):
+        buf = b''
+        sz = FRAME.size
+        try:
+            while True:
+                data = await r.read(65536)
+                if not data:
+                    break
+                buf += data
+                n = len(buf) // sz * sz
+                if n:
+                    self.feed(buf[:n])
+                    buf = buf[n:]
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            w.close()
+
+    async def main(self):
+        self.loop = asyncio.get_running_loop()
+        self.done = asyncio.Event()
+        tr = None
+        try:
+            srv = await asyncio.start_server(self.client, self.host, self.port)
+        except OSError as e:
+            self.err = e
+            self.ready.set()
+            return
+        if self.udp:
+            try:
+                tr, _ = await self.loop.create_datagram_endpoint(lambda: Datagrams(self), local_addr=(self.host, self.port))
+            except OSError as e:
+                # the tcp side is already listening; close it before start() raises
+                srv.close()
+                await srv.wait_closed()
+                self.err = e
+                self.ready.set()
+                return
+        self.ready.set()
+        async with srv:
+            await self.done.wait()
+        if tr:
+            tr.close()
+
+    def start(self):
+        self.ready.clear()
+        self.err = None
+        self.t = threading.Thread(target=asyncio.run, args=(self.main(),), daemon=True)
+        self.t.start()
+        self.ready.wait(5.0)
+        if self.err:
+            raise self.err
+        if self.log:
+            self.log.info(f"Input server listening on {self.host}:{self.port} (tcp{'+udp' if self.udp else ''})")
+
+    def stop(self):
+        if self.loop and self.done and self.t and self.t.is_alive():
+            self.loop.call_soon_threadsafe(self.done.set)
+            self.t.join(timeout=1.0)
+        self.loop = None
+
+    def summary(self):
+        per = self.applied / self.batches if self.batches else 0.0
+        return (f"input server: {self.received} frames received, {self.dropped} dropped, {self.bad} bad, "
+                f"queue depth {self.depth} (max {self.max_depth}), {per:.1f} frames per batch")
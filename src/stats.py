@@ -0,0 +1,101 @@
+import time
+
+NBUCKETS = 96
+
+
+def bucket(ns):
+    # 128 ns units, four linear sub-buckets per power of two
+    u = ns >> 7
+    if u < 4:
+        return u if u > 0 else 0
+    n = u.bit_length()
+    b = (n - 2) * 4 + ((u >> (n - 3)) & 3)
+    return b if b < NBUCKETS else NBUCKETS - 1
+
+
+def bucket_top(b):
+    if b < 4:
+        return (b + 1) << 7
+    n = b // 4 + 2
+    return ((4 + b % 4 + 1) << (n - 3)) << 7
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * NBUCKETS
+        self.n = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, ns):
+        self.counts[bucket(ns)] += 1
+        self.n += 1
+        self.total += ns
+        if ns > self.max:
+            self.max = ns
+
+    def pct(self, p):
+        if not self.n:
+            return 0
+        want = self.n * p / 100.0
+        seen = 0
+        for b, c in enumerate(self.counts):
+            seen += c
+            if seen >= want:
+                return min(bucket_top(b), self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.n if self.n else 0
+
+
+class Stats:
+    STAGES = ("move", "mouse", "dpad", "btns", "update", "tick", "interval", "latency")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        for s in self.STAGES:
+            setattr(self, s, Histogram())
+        self.ticks = 0
+        self.switches = 0
+        self.profile = None
+        self.start_ns = time.perf_counter_ns()
+        self.last_ns = 0
+
+    def record_tick(self, t0, t1, t2, t3, t4, t5, sent):
+        self.move.record(t1 - t0)
+        self.mouse.record(t2 - t1)
+        self.dpad.record(t3 - t2)
+        self.btns.record(t4 - t3)
+        if sent:
+            self.update.record(t5 - t4)
+        self.tick.record(t5 - t0)
+        if self.last_ns:
+            self.interval.record(t0 - self.last_ns)
+        self.last_ns = t0
+        self.ticks += 1
+
+    def rate(self):
+        el = (self.last_ns - self.start_ns) / 1e9
+        return self.ticks / el if el > 0 else 0.0
+
+
+def format_stats(st, rep=None, sched=None):
+    us = lambda ns: f"{ns / 1000:9.1f}"
+    lines = [f"{'stage':<10}{'count':>10}{'p50 us':>10}{'p99 us':>10}{'max us':>10}"]
+    for s in st.STAGES:
+        h = getattr(st, s)
+        lines.append(f"{s:<10}{h.n:>10}{us(h.pct(50))} {us(h.pct(99))} {us(h.max)}")
+
+    el = max(0, st.last_ns - st.start_ns) / 1e9
+    tr = f"tick rate: {st.rate():.1f} Hz over {el:.1f} s"
+    if sched:
+        tr += f" (target {sched.hz:g} Hz, overruns {sched.overruns})"
+    lines.append(tr)
+    if st.profile:
+        lines.append(f"profile: {st.profile}, {st.switches} switches")
+    if rep:
+        lines.append(f"reports: sent {rep.sent}, suppressed {rep.suppressed}")
+    return "\n".join(lines)
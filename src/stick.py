@@ -0,0 +1,188 @@
+import math
+
+FILTERS = ("none", "exp", "one_euro")
+
+
+class Clamp:
+    __slots__ = ('lim',)
+
+    def __init__(self, lim):
+        self.lim = lim
+
+    def run(self, p):
+        m = self.lim
+        if p.vx > m:
+            p.vx = m
+        elif p.vx < -m:
+            p.vx = -m
+        if p.vy > m:
+            p.vy = m
+        elif p.vy < -m:
+            p.vy = -m
+
+    def reset(self):
+        pass
+
+
+class Shape:
+    # integer deltas in [-r, r] -> stick values through the curve table
+    __slots__ = ('lut', 'r')
+
+    def __init__(self, curve):
+        self.lut = curve.lut
+        self.r = curve.r
+
+    def run(self, p):
+        p.vx = self.lut[self.r + p.vx]
+        p.vy = self.lut[self.r + p.vy]
+
+    def reset(self):
+        pass
+
+
+class Deadzone:
+    __slots__ = ('dz', 'dz2', 'radial')
+
+    def __init__(self, dz, radial=False):
+        self.dz = dz
+        self.dz2 = dz * dz
+        self.radial = radial
+
+    def run(self, p):
+        if self.radial:
+            if p.vx * p.vx + p.vy * p.vy < self.dz2:
+                p.vx = p.vy = 0.0
+            return
+        if -self.dz < p.vx < self.dz:
+            p.vx = 0.0
+        if -self.dz < p.vy < self.dz:
+            p.vy = 0.0
+
+    def reset(self):
+        pass
+
+
+class Smooth:
+    # exponential filter with a time constant, only engaged on jumps larger than `jump`
+    __slots__ = ('tau', 'jump')
+
+    def __init__(self, tau, jump=0.0):
+        if tau <= 0:
+            raise ValueError("Smoothing time constant must be positive")
+        self.tau = tau
+        self.jump = jump
+
+    def run(self, p):
+        if p.dt <= 0 or abs(p.vx - p.x) + abs(p.vy - p.y) <= self.jump:
+            return
+        a = 1.0 - math.exp(-p.dt / self.tau)
+        p.vx = p.x + a * (p.vx - p.x)
+        p.vy = p.y + a * (p.vy - p.y)
+
+    def reset(self):
+        pass
+
+
+class OneEuro:
+    __slots__ = ('mc', 'beta', 'dc', 'ex', 'ey')
+
+    def __init__(self, min_cutoff=1.0, beta=0.0, d_cutoff=1.0):
+        if min_cutoff <= 0 or d_cutoff <= 0:
+            raise ValueError("One-Euro cutoffs must be positive")
+        self.mc = min_cutoff
+        self.beta = beta
+        self.dc = d_cutoff
+        self.ex = self.ey = 0.0
+
+    def run(self, p):
+        dt = p.dt
+        if dt <= 0:
+            return
+        k = 2 * math.pi * dt
+        ad = k * self.dc / (1.0 + k * self.dc)
+        self.ex += ad * ((p.vx - p.x) / dt - self.ex)
+        self.ey += ad * ((p.vy - p.y) / dt - self.ey)
+        c = k * (self.mc + self.beta * abs(self.ex))
+        p.vx = p.x + c / (1.0 + c) * (p.vx - p.x)
+        c = k * (self.mc + self.beta * abs(self.ey))
+        p.vy = p.y + c / (1.0 + c) * (p.vy - p.y)
+
+    def reset(self):
+        self.ex = self.ey = 0.0
+
+
+class Decay:
+    # snap to centre once no motion has arrived for `s` seconds
+    __slots__ = ('s',)
+
+    def __init__(self, s):
+        self.s = s
+
+    def run(self, p):
+        if (p.x or p.y) and p.now - p.last > self.s:
+            p.x = p.y = 0.0
+            for st in p.stages:
+                st.reset()
+
+    def reset(self):
+        pass
+
+
+class Stick:
+    # stages see the raw input in vx/vy and the previous output in x/y
+    __slots__ = ('stages', 'decay', 'vx', 'vy', 'x', 'y', 'dt', 'now', 'last')
+
+    def __init__(self, stages, decay=None):
+        self.stages = tuple(stages)
+        self.decay = decay
+        self.clear()
+
+    def clear(self):
+        self.vx = self.vy = 0
+        self.x = self.y = 0.0
+        self.dt = 0.0
+        self.now = None
+        self.last = 0.0
+        for st in self.stages:
+            st.reset()
+
+    def step(self, dx, dy, now):
+        self.dt = now - self.now if self.now is not None else 0.0
+        self.now = now
+        if dx or dy:
+            self.vx = dx
+            self.vy = dy
+            for st in self.stages:
+                st.run(self)
+            self.x = self.vx
+            self.y = self.vy
+            self.last = now
+        elif self.decay:
+            self.decay.run(self)
+
+    def wake(self, now):
+        if not self.decay or not (self.x or self.y):
+            return None
+        return max(0.0, self.last + self.decay.s - now)
+
+
+def make_filter(c):
+    t = c.get("type", "none")
+    if t == "none":
+        return None
+    if t == "exp":
+        return Smooth(float(c.get("tau_ms", 6.0)) / 1000, float(c.get("jump", 0.0)))
+    if t == "one_euro":
+        return OneEuro(float(c.get("min_cutoff", 1.0)), float(c.get("beta", 0.0)), float(c.get("d_cutoff", 1.0)))
+    raise ValueError(f"Unknown smoothing filter '{t}'")
+
+
+def build(curve, st):
+    stages = [Clamp(curve.r), Shape(curve)]
+    if curve.radial and curve.dz:
+        stages.append(Deadzone(curve.dz, True))
+    f = make_filter(st.get("smoothing") or {"type": "none"})
+    if f:
+        stages.append(f)
+    d = float(st.get("decay_ms", 50))
+    return Stick(stages, Decay(d / 1000) if d > 0 else None)
@@ -0,0 +1,170 @@
+import heapq
+
+BTN = 0
+SPEC = 1
+TRIG = 2
+
+
+class Timers:
+    # one heap for every timed binding; stale entries are skipped by generation rather than removed,
+    # so a tick with nothing due costs a single comparison
+    def __init__(self):
+        self.h = []
+        self.n = 0
+
+    def at(self, due, b):
+        self.n += 1
+        heapq.heappush(self.h, (due, self.n, b, b.gen))
+
+    def run(self, now):
+        h = self.h
+        while h and h[0][0] <= now:
+            due, _, b, g = heapq.heappop(h)
+            if g == b.gen:
+                b.fire(due, self)
+
+    def next(self, now):
+        h = self.h
+        while h and h[0][3] != h[0][2].gen:
+            heapq.heappop(h)
+        return max(0.0, h[0][0] - now) if h else None
+
+    def clear(self):
+        self.h = []
+
+
+class Timed:
+    __slots__ = ('keys', 'kind', 'target', 'down', 'out', 'gen')
+    ramps = False
+
+    def __init__(self, keys, kind, target):
+        self.keys = keys
+        self.kind = kind
+        self.target = target
+        self.down = False
+        self.out = False
+        self.gen = 0
+
+    def edge(self, down, now, tm):
+        self.down = down
+
+    def fire(self, now, tm):
+        pass
+
+    def value(self, now):
+        return self.out
+
+    def apply(self, rep, now):
+        k = self.kind
+        if k == BTN:
+            rep.btn(self.target, self.out)
+        elif k == SPEC:
+            rep.special(self.target, self.out)
+        else:
+            v = self.value(now)
+            rep.trig(self.target, 1.0 if v is True else v or 0.0)
+
+
+class Turbo(Timed):
+    __slots__ = ('half',)
+
+    def __init__(self, keys, kind, target, hz):
+        super().__init__(keys, kind, target)
+        self.half = 0.5 / hz
+
+    def edge(self, down, now, tm):
+        self.down = down
+        self.gen += 1
+        self.out = down
+        if down:
+            tm.at(now + self.half, self)
+
+    def fire(self, now, tm):
+        self.out = not self.out
+        tm.at(now + self.half, self)
+
+
+class Toggle(Timed):
+    __slots__ = ()
+
+    def __init__(self, keys, kind, target, _=0):
+        super().__init__(keys, kind, target)
+
+    def edge(self, down, now, tm):
+        self.down = down
+        if down:
+            self.out = not self.out
+
+
+class Hold(Timed):
+    __slots__ = ('s',)
+
+    def __init__(self, keys, kind, target, ms):
+        super().__init__(keys, kind, target)
+        self.s = ms / 1000
+
+    def edge(self, down, now, tm):
+        self.down = down
+        self.gen += 1
+        self.out = False
+        if down:
+            tm.at(now + self.s, self)
+
+    def fire(self, now, tm):
+        self.out = True
+
+
+class DoubleTap(Timed):
+    # active while the second press of a quick double tap is held
+    __slots__ = ('s', 'last')
+
+    def __init__(self, keys, kind, target, ms):
+        super().__init__(keys, kind, target)
+        self.s = ms / 1000
+        self.last = None
+
+    def edge(self, down, now, tm):
+        self.down = down
+        if not down:
+            self.out = False
+        elif self.last is not None and now - self.last <= self.s:
+            self.out = True
+            self.last = None
+        else:
+            self.last = now
+
+
+class Ramp(Timed):
+    # trigger value follows how long the key has been held, reaching 1.0 after `ms`
+    __slots__ = ('s', 't0')
+    ramps = True
+
+    def __init__(self, keys, kind, target, ms):
+        super().__init__(keys, kind, target)
+        self.s = ms / 1000
+        self.t0 = 0.0
+
+    def edge(self, down, now, tm):
+        self.down = down
+        self.out = down
+        self.t0 = now
+
+    def value(self, now):
+        if not self.down:
+            return 0.0
+        return min(1.0, (now - self.t0) / self.s)
+
+
+MODES = {"turbo": Turbo, "toggle": Toggle, "hold": Hold, "double": DoubleTap, "analog": Ramp}
+
+
+def build(entries):
+    # entries come from Binds.timed
+    return [MODES[m](ks, kind, t, p) for ks, kind, t, m, p in entries]
+
+
+def wake(tb, tm, now, step):
+    for b in tb:
+        if b.ramps and b.down and now - b.t0 < b.s:
+            return step
+    return tm.next(now)
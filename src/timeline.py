@@ -0,0 +1,134 @@
+import json
+from .ds4 import BUTTONS, SPECIAL, DPAD, DPAD_NONE
+from .report import axis, trigger, neutral
+
+LX, LY, RX, RY, L2, R2, BTNS, SPEC, DP = range(9)
+STICKS = {"left": (LX, LY), "right": (RX, RY)}
+TRIGS = {"l2": L2, "r2": R2}
+
+DEMO = {
+    "name": "demo",
+    "steps": [
+        {"at": 0, "tap": "cross", "ms": 500},
+        {"at": 500, "stick": "left", "x": 1.0, "y": 0.0},
+        {"at": 1500, "stick": "left", "x": 0.0, "y": 1.0},
+        {"at": 2500, "stick": "left", "x": -1.0, "y": 0.0},
+        {"at": 3500, "stick": "left", "x": 0.0, "y": -1.0},
+        {"at": 4500, "stick": "left", "x": 0.0, "y": 0.0},
+        {"at": 4500, "trigger": "l2", "value": 1.0},
+        {"at": 5000, "trigger": "r2", "value": 1.0},
+        {"at": 5500, "reset": True},
+    ],
+}
+
+
+def load_script(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def ms(v):
+    return int(float(v) * 1_000_000)
+
+
+def btn(name):
+    if name in BUTTONS:
+        return BTNS, BUTTONS[name]
+    if name in SPECIAL:
+        return SPEC, SPECIAL[name]
+    raise ValueError(f"Unknown button '{name}'")
+
+
+def ramp(ops, t, dur, step, fields, a, b, conv):
+    n = max(1, dur // step)
+    for i in range(n + 1):
+        f = i / n
+        for fi, x0, x1 in zip(fields, a, b):
+            ops.append((t + min(i * step, dur), fi, 'set', conv(x0 + (x1 - x0) * f)))
+
+
+def compile_script(sc, hz=1000):
+    step = int(1_000_000_000 / hz)
+    ops = []
+    for s in sc.get("steps", []):
+        t = ms(s.get("at", 0))
+        if "press" in s or "release" in s:
+            down = "press" in s
+            fi, b = btn(s["press"] if down else s["release"])
+            ops.append((t, fi, 'or' if down else 'clear', b))
+        elif "tap" in s:
+            fi, b = btn(s["tap"])
+            ops.append((t, fi, 'or', b))
+            ops.append((t + ms(s.get("ms", 100)), fi, 'clear', b))
+        elif "stick" in s and "ms" in s:
+            fs = STICKS[s["stick"]]
+            ramp(ops, t, ms(s["ms"]), step, fs, s.get("from", (0.0, 0.0)), s.get("to", (0.0, 0.0)), axis)
+        elif "stick" in s:
+            fs = STICKS[s["stick"]]
+            ops.append((t, fs[0], 'set', axis(s.get("x", 0.0))))
+            ops.append((t, fs[1], 'set', axis(s.get("y", 0.0))))
+        elif "trigger" in s and "ms" in s:
+            ramp(ops, t, ms(s["ms"]), step, (TRIGS[s["trigger"]],), (s.get("from", 0.0),), (s.get("to", 1.0),), trigger)
+        elif "trigger" in s:
+            ops.append((t, TRIGS[s["trigger"]], 'set', trigger(s.get("value", 1.0))))
+        elif "dpad" in s:
+            d = s["dpad"]
+            ops.append((t, DP, 'set', DPAD_NONE if d in (None, "none") else DPAD[d]))
+        elif s.get("reset"):
+            ops.append((t, -1, 'reset', 0))
+        else:
+            raise ValueError(f"Unknown script step: {s}")
+
+    ops.sort(key=lambda o: o[0])
+    frames = []
+    st = list(neutral())
+    for i, (t, fi, op, v) in enumerate(ops):
+        if op == 'set':
+            st[fi] = v
+        elif op == 'or':
+            st[fi] |= v
+        elif op == 'clear':
+            st[fi] &= ~v
+        else:
+            st = list(neutral())
+        if i + 1 == len(ops) or ops[i + 1][0] != t:
+            frames.append((t, tuple(st)))
+    return frames
+
+
+class Timeline:
+    def __init__(self, frames, name="script", mode="override", loop=False):
+        if mode not in ("override", "merge"):
+            raise ValueError(f"Unknown timeline mode '{mode}'")
+        self.frames = frames
+        self.name = name
+        self.mode = mode
+        self.loop = loop
+        self.t0 = None
+        self.i = 0
+        self.done = not frames
+        self.end = frames[-1][0] if frames else 0
+
+    @classmethod
+    def from_script(cls, sc, hz=1000):
+        return cls(compile_script(sc, hz), sc.get("name", "script"), sc.get("mode", "override"), sc.get("loop", False))
+
+    def frame(self, now):
+        if self.done:
+            return None
+        if self.t0 is None:
+            self.t0 = now
+        fr = self.frames
+        el = now - self.t0
+        if el > self.end:
+            if not self.loop or not self.end:
+                self.done = True
+                return fr[-1][1]
+            self.t0 += el // self.end * self.end
+            el = now - self.t0
+            self.i = 0
+        i = self.i
+        while i + 1 < len(fr) and fr[i + 1][0] <= el:
+            i += 1
+        self.i = i
+        return fr[i][1] if fr[i][0] <= el else None
@@ -0,0 +1,273 @@
+import time
+import keyboard
+import mouse
+from .backends import InputBackend, PadBackend, Accumulator, EDGE
+from .report import neutral
+
+METRICS_TTL = 5.0
+
+
+class WinInput(InputBackend):
+    def __init__(self):
+        super().__init__()
+        import win32api
+        self.w32 = win32api
+        self.kh = None
+        self.mh = None
+        self.size = None
+        self.size_t = 0.0
+        self.last = None
+        self.pos = None
+        self.hl = None
+        self.wp = None
+        self.acc = Accumulator()
+
+    def start(self):
+        self.wh.clear()
+        if self.tap or self.wheel:
+            self.hook()
+
+    def stop(self):
+        self.unhook()
+        super().stop()
+
+    def hook(self):
+        if self.kh is None:
+            self.kh = keyboard.hook(self.on_key)
+        if self.mh is None:
+            self.mh = mouse.hook(self.on_mouse)
+
+    def unhook(self):
+        if self.kh is not None:
+            keyboard.unhook(self.kh)
+            self.kh = None
+        if self.mh is not None:
+            mouse.unhook(self.mh)
+            self.mh = None
+        self.pos = self.wp = None
+
+    def on_key(self, e):
+        if self.tap:
+            self.tap.key(e.scan_code, e.event_type == keyboard.KEY_DOWN)
+
+    def on_mouse(self, e):
+        if isinstance(e, mouse.MoveEvent):
+            self.motion(e.x, e.y)
+            return
+        if isinstance(e, mouse.WheelEvent):
+            if self.tap:
+                self.tap.scroll(e.delta)
+            if self.wheel:
+                self.wh.add(e.delta, 0)
+                self.mark()
+            return
+        if self.tap and isinstance(e, mouse.ButtonEvent):
+            self.tap.button(e.button, e.event_type != mouse.UP)
+
+    def scan_codes(self, name):
+        return keyboard.key_to_scan_codes(name)
+
+    def pressed(self, k):
+        for c in k:
+            try:
+                if c.__class__ is int:
+                    if keyboard.is_pressed(c):
+                        return True
+                elif mouse.is_pressed(c):
+                    return True
+            except Exception:
+                pass
+        return False
+
+    def snapshot(self, polls):
+        # the keyboard library has no public call for the whole keyboard, so each bound key is read once
+        m = 0
+        kp = keyboard.is_pressed
+        mp = mouse.is_pressed
+        for b, t in polls:
+            try:
+                if kp(t) if t.__class__ is int else mp(t):
+                    m |= b
+            except Exception:
+                pass
+        return m
+
+    def get_position(self):
+        # the hook keeps pos current; without it every call asks the system
+        p = self.pos
+        return mouse.get_position() if p is None else p
+
+    def metrics(self):
+        self.size = (self.w32.GetSystemMetrics(0), self.w32.GetSystemMetrics(1))
+        self.size_t = time.monotonic()
+        return self.size
+
+    def screen_size(self):
+        # display changes are rare; re-read the metrics every few seconds instead of every tick
+        if self.size is None or time.monotonic() - self.size_t > METRICS_TTL:
+            return self.metrics()
+        return self.size
+
+    def near_edge(self, x, y):
+        w, h = self.size
+        return x < EDGE or y < EDGE or x >= w - EDGE or y >= h - EDGE
+
+    def center(self):
+        w, h = self.screen_size()
+        return w // 2, h // 2
+
+    def begin_mouse(self):
+        # motion comes from the mouse hook in every input mode: polling the cursor once a
+        # tick aliases a fast mouse against the tick rate
+        self.metrics()
+        cx, cy = self.center()
+        self.set_cursor(cx, cy)
+        self.last = mouse.get_position()
+        self.pos = self.hl = self.last
+        self.wp = None
+        self.acc.clear()
+        if self.mh is None:
+            self.mh = mouse.hook(self.on_mouse)
+
+    def motion(self, x, y):
+        # runs on the hook thread, which is the only writer of hl, wp and acc
+        self.pos = (x, y)
+        l = self.hl
+        self.hl = (x, y)
+        if l is None:
+            return
+        p = self.wp
+        if p is not None and abs(x - p[0]) + abs(y - p[1]) < abs(x - l[0]) + abs(y - l[1]):
+            # the first move landing nearer the recenter target than the edge is measured from
+            # the target; moves queued before the warp still carry edge positions and are
+            # measured from the last real one, so neither side reads the jump as motion
+            l = p
+            self.wp = None
+        w, h = self.screen_size()
+        if x < 0 or y < 0 or x >= w or y >= h:
+            self.metrics()
+        if self.relative and self.wp is None and self.near_edge(x, y):
+            self.wp = self.center()
+            self.set_cursor(*self.wp)
+        dx, dy = x - l[0], y - l[1]
+        if dx or dy:
+            self.acc.add(dx, dy)
+            if self.tap:
+                self.tap.motion(dx, dy)
+            self.mark()
+
+    def deltas(self):
+        return self.acc.drain()
+
+    def set_cursor(self, x, y):
+        self.w32.SetCursorPos((x, y))
+
+    def show_cursor(self, show):
+        self.w32.ShowCursor(show)
+
+
+class WinPad(PadBackend):
+    def __init__(self):
+        import vgamepad
+        self.gp = vgamepad.VDS4Gamepad()
+        self.ex = None
+        self.r = self.t = self.d = None
+        self.n = 0
+
+    def extended(self):
+        # one report for the life of the pad; every tick only writes its fields
+        from vgamepad.win.vigem_commons import DS4_REPORT_EX
+        self.ex = DS4_REPORT_EX()
+        self.r = self.ex.Report
+        self.r.bTouchPacketsN = 1
+        self.t = self.r.sCurrentTouch
+        self.d = self.t.bTouchData1
+
+    def submit_ex(self, s):
+        if self.ex is None:
+            self.extended()
+        r = self.r
+        r.bThumbLX = s[0]
+        r.bThumbLY = s[1]
+        r.bThumbRX = s[2]
+        r.bThumbRY = s[3]
+        r.bTriggerL = s[4]
+        r.bTriggerR = s[5]
+        r.wButtons = s[6] | s[8]
+        r.bSpecial = s[7]
+        r.wGyroX = s[9]
+        r.wGyroY = s[10]
+        r.wGyroZ = s[11]
+        r.wAccelX = s[12]
+        r.wAccelY = s[13]
+        r.wAccelZ = s[14]
+        # the timestamp counts in 5.33 us steps
+        r.wTimestamp = (time.perf_counter_ns() // 5333) & 0xFFFF
+        t = self.t
+        self.n = (self.n + 1) & 0xFF
+        t.bPacketCounter = self.n
+        t.bIsUpTrackingNum1 = s[15]
+        x, y = s[16], s[17]
+        d = self.d
+        d[0] = x & 0xFF
+        d[1] = (x >> 8) & 0x0F | (y & 0x0F) << 4
+        d[2] = (y >> 4) & 0xFF
+        self.gp.update_extended_report(self.ex)
+
+    def submit(self, s, l):
+        if len(s) > 9:
+            self.submit_ex(s)
+            return
+        gp = self.gp
+        if len(l) > 9:
+            # the per-field report went stale while extended reports were sent
+            gp.reset()
+            l = neutral()
+        if s[0:2] != l[0:2]:
+            gp.left_joystick(x_value=s[0], y_value=s[1])
+        if s[2:4] != l[2:4]:
+            gp.right_joystick(x_value=s[2], y_value=s[3])
+        if s[4] != l[4]:
+            gp.left_trigger(value=s[4])
+        if s[5] != l[5]:
+            gp.right_trigger(value=s[5])
+
+        ch = s[6] ^ l[6]
+        while ch:
+            b = ch & -ch
+            ch ^= b
+            if s[6] & b:
+                gp.press_button(button=b)
+            else:
+                gp.release_button(button=b)
+
+        ch = s[7] ^ l[7]
+        while ch:
+            b = ch & -ch
+            ch ^= b
+            if s[7] & b:
+                gp.press_special_button(special_button=b)
+            else:
+                gp.release_special_button(special_button=b)
+
+        if s[8] != l[8]:
+            gp.directional_pad(direction=s[8])
+
+        gp.update()
+
+    def reset(self):
+        self.gp.reset()
+        self.gp.update()
+
+    def listen(self, fn):
+        # vgamepad checks this signature against its dummy_callback, names included; the
+        # driver passes the LED number as one byte, not a lightbar colour
+        def cb(client, target, large_motor, small_motor, led_number, user_data):
+            fn(large_motor, small_motor, led_number)
+        self.gp.register_notification(callback_function=cb)
+
+    def close(self):
+        try:
+            self.gp.unregister_notification()
+        except Exception:
+            pass